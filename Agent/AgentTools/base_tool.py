@@ -1,12 +1,20 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
+from Utils.metrics import metrics, span
+from .cache import get_tool_cache
+from .observation import Observation
 
 class BaseTool(ABC):
     """Abstract base class for all tools"""
-    
-    def __init__(self, name, description):
+
+    def __init__(self, name, description, cache_ttl=0, timeout=15, max_tokens=400):
         self._name = name.lower()  # Store the name in lowercase for consistency
         self._description = description
-    
+        self.cache_ttl = cache_ttl  # Seconds a result stays fresh in the tool cache, 0 disables caching
+        self.timeout = timeout  # Seconds the agent waits for a result before giving up on the tool
+        self.max_tokens = max_tokens  # Budget of the observation added to the history, 0 for no limit
+
     @property
     def name(self):
         """Getter for tool name."""
@@ -16,8 +24,52 @@ class BaseTool(ABC):
     def description(self):
         """Getter for tool description."""
         return self._description
-    
+
     @abstractmethod
     def use(self, query):
-        """Each tool must implement its own `use` method"""
+        """Each tool must implement its own `use` method, returning a string or an Observation"""
         pass
+
+    async def ause(self, query):
+        """Async version of `use`. By default runs the sync `use` in a worker thread."""
+        return await asyncio.to_thread(self.use, query)
+
+    def deadline(self):
+        """Returns the `time.monotonic()` by which the HTTP calls of `use` must finish.
+
+        It leaves a margin before the agent gives up on the tool, so retries don't keep a
+        worker thread busy after nobody waits for the result.
+        """
+        return time.monotonic() + self.timeout * 0.8
+
+    def observe(self, query, result):
+        """Returns the result of `use` as compact text, trimmed to the token budget of the tool."""
+        return Observation.from_result(result).fit(query, self.max_tokens).render()
+
+    def is_cacheable(self, result):
+        """Whether a result can be stored in the cache. Tools override it to skip error messages."""
+        return True
+
+    def run(self, query):
+        """Returns the result of `use`, served from the tool cache while it is fresh."""
+        with span(f"tool:{self.name}", query=query):
+            start_time = time.perf_counter()
+            hit, result = get_tool_cache().get(self.name, query) if self.cache_ttl else (False, None)
+            if not hit:
+                result = self.observe(query, self.use(query))
+                if self.cache_ttl and self.is_cacheable(result):
+                    get_tool_cache().set(self.name, query, result, self.cache_ttl)
+            metrics.observe("agent_tool_seconds", time.perf_counter() - start_time, tool=self.name, cached=str(hit).lower())
+            return result
+
+    async def arun(self, query):
+        """Async version of `run`."""
+        with span(f"tool:{self.name}", query=query):
+            start_time = time.perf_counter()
+            hit, result = await get_tool_cache().aget(self.name, query) if self.cache_ttl else (False, None)
+            if not hit:
+                result = self.observe(query, await self.ause(query))
+                if self.cache_ttl and self.is_cacheable(result):
+                    await get_tool_cache().aset(self.name, query, result, self.cache_ttl)
+            metrics.observe("agent_tool_seconds", time.perf_counter() - start_time, tool=self.name, cached=str(hit).lower())
+            return result
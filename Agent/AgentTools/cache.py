@@ -0,0 +1,122 @@
+import asyncio
+import os
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from Utils.metrics import metrics
+
+
+def normalize_query(query):
+    """Normalizes a tool query so equivalent inputs share a cache entry."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" .,;:!?'\"")
+
+
+class ToolCache:
+    """LRU cache of tool results with a TTL per entry and hit/miss counters.
+
+    When a path is given, entries are also written to a SQLite file so they survive restarts.
+    """
+
+    def __init__(self, max_entries=1024, path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = {}
+        self.misses = {}
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS tool_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            self.db.commit()
+
+    def get(self, tool_name, query):
+        """Returns (hit, value) for the tool and query."""
+        key = f"{tool_name}:{normalize_query(query)}"
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._store(key, entry)
+
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.hits[tool_name] = self.hits.get(tool_name, 0) + 1
+                metrics.inc("agent_tool_cache_hits_total", tool=tool_name)
+                return True, entry[0]
+
+            if entry is not None:
+                self._delete(key)
+            self.misses[tool_name] = self.misses.get(tool_name, 0) + 1
+            metrics.inc("agent_tool_cache_misses_total", tool=tool_name)
+            return False, None
+
+    def set(self, tool_name, query, value, ttl):
+        """Stores a tool result for `ttl` seconds."""
+        key = f"{tool_name}:{normalize_query(query)}"
+        entry = (value, time.time() + ttl)
+        with self.lock:
+            self._store(key, entry)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO tool_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), entry[1])
+                )
+                self.db.commit()
+
+    async def aget(self, tool_name, query):
+        """Async version of `get`. The SQLite file is read in a worker thread, off the event loop."""
+        if self.db is None:
+            return self.get(tool_name, query)
+        return await asyncio.to_thread(self.get, tool_name, query)
+
+    async def aset(self, tool_name, query, value, ttl):
+        """Async version of `set`. The SQLite file is written in a worker thread, off the event loop."""
+        if self.db is None:
+            return self.set(tool_name, query, value, ttl)
+        return await asyncio.to_thread(self.set, tool_name, query, value, ttl)
+
+    def stats(self):
+        """Returns the hit and miss counters per tool."""
+        with self.lock:
+            return {
+                tool_name: {"hits": self.hits.get(tool_name, 0), "misses": self.misses.get(tool_name, 0)}
+                for tool_name in sorted(set(self.hits) | set(self.misses))
+            }
+
+    def _store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _delete(self, key):
+        self.entries.pop(key, None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+            self.db.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache():
+    """Returns the process-wide tool cache, configured from TOOL_CACHE_SIZE and TOOL_CACHE_PATH."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                load_dotenv()
+                _cache = ToolCache(
+                    max_entries=int(os.getenv("TOOL_CACHE_SIZE", 1024)),
+                    path=os.getenv("TOOL_CACHE_PATH") or None
+                )
+    return _cache
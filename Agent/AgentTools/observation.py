@@ -0,0 +1,103 @@
+import re
+from Utils.tokenizer import CHARS_PER_TOKEN
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for the observation budgets, which don't need exact counts."""
+    return int(len(text) / CHARS_PER_TOKEN) + 1 if text else 0
+
+
+MIN_CUT_TOKENS = 10  # Budget left below which a sentence isn't worth cutting to fit
+
+
+def cut(sentence, max_tokens):
+    """Returns the start of the sentence fitting in about `max_tokens`, marked as cut."""
+    return sentence[:max(int((max_tokens - 1) * CHARS_PER_TOKEN), 0)].rstrip() + "…"
+
+
+def terms(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def split_sentences(text):
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", " ".join(text.split())) if sentence]
+
+
+class Snippet:
+    """A piece of a tool result: a page summary, a search hit..."""
+    __slots__ = ("title", "text", "source", "score")
+
+    def __init__(self, title=None, text="", source=None, score=None):
+        self.title = title
+        self.text = text
+        self.source = source  # Where the text comes from, e.g. a URL
+        self.score = score  # Relevance given by the tool, from 0 to 1, if any
+
+    def header(self):
+        parts = [self.title or ""] + ([f"({self.source})"] if self.source else [])
+        header = " ".join(part for part in parts if part)
+        return f"{header}: " if header else ""
+
+
+class Observation:
+    """Result of a tool as written into the history, made of one or more snippets.
+
+    It renders to compact text, one line per snippet, and `fit` trims it to a token
+    budget keeping the sentences most relevant to the query.
+    """
+    __slots__ = ("snippets",)
+
+    def __init__(self, snippets):
+        self.snippets = list(snippets)
+
+    @classmethod
+    def from_result(cls, result):
+        """Wraps a plain result, e.g. a string, into an observation."""
+        if isinstance(result, Observation):
+            return result
+        return cls([Snippet(text=str(result))])
+
+    def render(self):
+        if len(self.snippets) == 1:
+            return self.snippets[0].header() + self.snippets[0].text
+        return "\n".join(f"[{i}] {snippet.header()}{snippet.text}" for i, snippet in enumerate(self.snippets, 1))
+
+    def fit(self, query, max_tokens):
+        """Returns the observation trimmed to about `max_tokens`, keeping whole sentences by relevance.
+
+        Sentences are ranked by the share of query words they contain, the score of their
+        snippet and a bonus for the opening sentence, then kept in their original order.
+        """
+        if not max_tokens or estimate_tokens(self.render()) <= max_tokens:
+            return self
+
+        query_terms = terms(query)
+        candidates, seen = [], set()
+        for i, snippet in enumerate(self.snippets):
+            for j, sentence in enumerate(split_sentences(snippet.text)):
+                if sentence in seen:  ## Search hits often repeat the same sentence.
+                    continue
+                seen.add(sentence)
+                overlap = len(query_terms & terms(sentence)) / len(query_terms) if query_terms else 0
+                relevance = overlap + 0.5 * (snippet.score or 0) + (0.5 if j == 0 else 0)
+                candidates.append((-relevance, i, j, sentence))
+
+        used = sum(estimate_tokens(f"[{i}] {snippet.header()}") for i, snippet in enumerate(self.snippets, 1))
+        kept = {}
+        for _, i, j, sentence in sorted(candidates):
+            cost = estimate_tokens(sentence)
+            if used + cost <= max_tokens:
+                kept.setdefault(i, []).append((j, sentence))
+                used += cost
+            elif max_tokens - used >= MIN_CUT_TOKENS:  ## Too long for what is left: cut it rather than skip it for less relevant ones.
+                kept.setdefault(i, []).append((j, cut(sentence, max_tokens - used)))
+                used = max_tokens
+
+        if not kept:  ## Not even one sentence fits: cut the most relevant one.
+            _, i, j, sentence = min(candidates) if candidates else (0, 0, 0, "")
+            kept[i] = [(j, cut(sentence, max_tokens))]
+
+        return Observation(
+            Snippet(snippet.title, " ".join(sentence for _, sentence in sorted(kept[i])), snippet.source, snippet.score)
+            for i, snippet in enumerate(self.snippets) if i in kept
+        )
@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when an upstream failed too often and calls to it are paused."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after consecutive failures, then lets one trial call through."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call can be made now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()  ## Half-open: this call is the trial, others keep waiting.
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HttpTransport:
+    """Shared HTTP transport for the tools.
+
+    Keeps connections alive in a pool, always sets connect/read timeouts, retries transient
+    failures with jittered exponential backoff and keeps a circuit breaker per upstream host.
+    """
+
+    def __init__(self, pool_size=20, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.3):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def breaker(self, host):
+        """Returns the circuit breaker of an upstream host."""
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker()
+            return self.breakers[host]
+
+    def request(self, method, url, deadline=None, **kwargs):
+        """Sends a request, retrying connection errors, timeouts and retryable status codes.
+
+        With a `deadline` (a `time.monotonic()` value), the timeouts of each attempt are cut to the
+        time left and no retry starts past it, so a worker thread isn't held after its caller gave up.
+        """
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {host}, skipping the call.")
+
+        timeouts = kwargs.pop("timeout", self.timeout)
+        timeouts = timeouts if isinstance(timeouts, tuple) else (timeouts, timeouts)
+        for attempt in range(self.retries + 1):
+            timeout = timeouts
+            if deadline is not None:
+                timeout = tuple(min(part, max(deadline - time.monotonic(), 0.01)) for part in timeouts)
+            try:
+                response, error = self.session.request(method, url, timeout=timeout, **kwargs), None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+
+            delay = random.uniform(0, self.backoff * 2 ** attempt)  ## Full jitter.
+            if attempt == self.retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                breaker.record_failure()
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Returns the process-wide HTTP transport shared by every tool."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
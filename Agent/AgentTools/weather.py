@@ -2,13 +2,15 @@ import os
 import requests
 from dotenv import load_dotenv
 from .base_tool import BaseTool
+from .transport import get_transport
 
 class Weather(BaseTool):
     def __init__(self):
         load_dotenv()
         super().__init__(
             name="weather",
-            description="Fetches weather information for a given city. Input is only the name of the city. e.g. 'London'."
+            description="Fetches weather information for a given city. Input is only the name of the city. e.g. 'London'.",
+            cache_ttl=600
         )
         self.api_key = os.getenv("OPENWEATHER_API_KEY")
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
@@ -18,9 +20,12 @@ class Weather(BaseTool):
         if not query:
             raise ValueError("City cannot be empty.")
 
-        url = f"{self.base_url}?q={query}&appid={self.api_key}&units=metric"
-        response = requests.get(url)
-        
+        params = {"q": query, "appid": self.api_key, "units": "metric"}
+        try:
+            response = get_transport().get(self.base_url, params=params, deadline=self.deadline())
+        except requests.RequestException:
+            return f"Failed to fetch weather data for {query}."
+
         if response.status_code == 200:
             data = response.json()
             temperature = data['main']['temp']
@@ -37,6 +42,9 @@ class Weather(BaseTool):
         
         return f"Failed to fetch weather data for {query}."
 
+    def is_cacheable(self, result):
+        return not result.startswith("Failed to fetch")
+
 
 
 ### For testing running directly the script
@@ -1,36 +1,48 @@
 import os
+import requests
 from dotenv import load_dotenv
-from tavily import TavilyClient
 from .base_tool import BaseTool
+from .observation import Observation, Snippet
+from .transport import get_transport
 
 class Searcher(BaseTool):
     def __init__(self):
         load_dotenv()
         super().__init__(
             name="websearch",
-            description="Search the web for information. Input is a query. e.g. 'Champion of the 2024 Champions League'."
+            description="Search the web for information. Input is a query. e.g. 'Champion of the 2024 Champions League'.",
+            cache_ttl=1800
         )
-        self.tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+        self.api_key = os.getenv("TAVILY_API_KEY")
+        self.base_url = "https://api.tavily.com/search"
 
     def use(self, query):
         """Performs a web search for a given query."""
         if not query:
             raise ValueError("Query cannot be empty.")
-        search_results = self.tavily_client.search(query=query, max_results=2)
+        try:
+            response = get_transport().post(
+                self.base_url,
+                json={"query": query, "max_results": 2},
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                deadline=self.deadline()
+            )
+            response.raise_for_status()
+            search_results = response.json()
+        except requests.RequestException:
+            return "An error occurred while searching the web."
 
         if search_results and "results" in search_results:
-            formatted_results = []
-            for result in search_results["results"]:
-                formatted_result = {
-                    "title": result.get("title"),
-                    "content": result.get("content"),
-                    "url": result.get("url"),
-                    "score": result.get("score"),
-                }
-                formatted_results.append(formatted_result)
-            return formatted_results if formatted_results else "No results found."
+            snippets = [
+                Snippet(title=result.get("title"), text=result.get("content") or "", source=result.get("url"), score=result.get("score"))
+                for result in search_results["results"]
+            ]
+            return Observation(snippets) if snippets else "No results found."
         return "No search results available."
 
+    def is_cacheable(self, result):
+        return result != "An error occurred while searching the web."
+
 
 ### For testing running directly the script
 if __name__ == '__main__':
@@ -41,7 +53,7 @@ if __name__ == '__main__':
         for query in queries:
             result = searcher.use(query)
             if result:
-                print(f"Context for '{query}':\n{result}\n")
+                print(f"Context for '{query}':\n{searcher.observe(query, result)}\n")
             else:
                 print(f"No context found for '{query}'\n")
 
@@ -1,14 +1,55 @@
-import wikipediaapi
-import json
+import os
+from dotenv import load_dotenv
+from Utils.metrics import metrics
 from .base_tool import BaseTool
+from .observation import Observation, Snippet
+from .transport import get_transport
+from .wiki_index import WikiIndex
 
 class Wiki(BaseTool):
-    def __init__(self, language="en", user_agent="ReAct Agent from Wencho"):
+    def __init__(self, language="en", user_agent="ReAct Agent from Wencho", index_path=None):
+        load_dotenv()
         super().__init__(
             name="wikipedia",
-            description="Gets information from a Wikipedia entry. Specific Wikipedia input. e.g. 'Cristiano Ronaldo'."
+            description="Gets information from a Wikipedia entry. Specific Wikipedia input. e.g. 'Cristiano Ronaldo'.",
+            cache_ttl=86400,
+            max_tokens=500
         )
-        self.wiki_api = wikipediaapi.Wikipedia(user_agent=user_agent, language=language)
+        self.base_url = f"https://{language}.wikipedia.org/w/api.php"
+        self.headers = {"User-Agent": user_agent}
+        self.index_path = index_path or os.getenv("WIKI_INDEX_PATH") or None  # Local index built with `python -m AgentTools.wiki_index`
+        self._index = None
+
+    @property
+    def index(self):
+        """Returns the local index, opened on first use, or None if there is none."""
+        if self._index is None and self.index_path:
+            try:
+                self._index = WikiIndex(self.index_path)
+            except (OSError, ValueError) as e:
+                print(f"Local Wikipedia index disabled, using the live API: {e}")
+                self.index_path = None
+        return self._index
+
+    def fetch_page(self, title):
+        """Returns the title and intro extract of a page, or None if it doesn't exist."""
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "redirects": 1,
+            "titles": title,
+        }
+        response = get_transport().get(self.base_url, params=params, headers=self.headers, deadline=self.deadline())
+        response.raise_for_status()
+        pages = response.json().get("query", {}).get("pages", [])
+
+        if pages and not pages[0].get("missing") and not pages[0].get("invalid"):
+            return {"title": pages[0]["title"], "extract": pages[0].get("extract", "")}
+        return None
 
     def use(self, query):
         """Fetches summary information from Wikipedia for a given topic."""
@@ -16,19 +57,22 @@ class Wiki(BaseTool):
             raise ValueError("Query cannot be empty.")
 
         try:
-            page = self.wiki_api.page(query)
-            
-            if page.exists():
-                return json.dumps({
-                    "query": query,
-                    "title": page.title,
-                    "summary": page.summary
-                }, ensure_ascii=False, indent=2)
+            page = self.index.lookup(query) if self.index else None
+            if self.index:
+                metrics.inc("agent_wiki_index_lookups_total", result="hit" if page else "miss")
+            if page is None:
+                page = self.fetch_page(query)
+
+            if page:
+                return Observation([Snippet(title=page["title"], text=page["extract"])])
             return f"No Wikipedia page found for '{query}'."
 
         except Exception:
             return "An error occurred while searching Wikipedia."
 
+    def is_cacheable(self, result):
+        return result != "An error occurred while searching Wikipedia."
+
 
 ### For testing running directly the script
 if __name__ == '__main__':
@@ -38,6 +82,6 @@ if __name__ == '__main__':
     for query in queries:
         result = wiki.use(query)
         if result:
-            print(f"JSON result for '{query}':\n{result}\n")
+            print(f"Result for '{query}':\n{wiki.observe(query, result)}\n")
         else:
             print(f"No result found for '{query}'\n")
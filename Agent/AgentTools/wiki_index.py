@@ -0,0 +1,218 @@
+"""Local, memory-mapped index of Wikipedia page summaries for the Wiki tool.
+
+Build it from a Wikipedia abstracts dump (enwiki-latest-abstract.xml[.gz]) or from JSON lines
+with "title" and "abstract" fields, from the Agent folder:
+    python -m AgentTools.wiki_index build enwiki-latest-abstract.xml.gz --out wiki_index --titles popular.txt
+    python -m AgentTools.wiki_index lookup wiki_index "cristiano ronaldo"
+
+Files of an index:
+    summaries.bin  "title\\nsummary" records, UTF-8
+    keys.bin       normalized titles, sorted, plus the titles of parenthetical disambiguations
+                   without the parentheses, e.g. "mercury" for "Mercury (planet)"
+    index.bin      one fixed-size record per key: key offset and length, summary offset and length
+"""
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import struct
+import time
+import unicodedata
+import xml.etree.ElementTree as ElementTree
+
+
+MAGIC = b"WIKIIDX1"
+HEADER = struct.Struct("<8sQ")  # Magic, number of titles
+RECORD = struct.Struct("<QIQI")  # Key offset, key length, summary offset, summary length
+FUZZY_WINDOW = 8  # Neighbours of the insertion point compared on a miss
+MIN_FUZZY_LENGTH = 8  # Shorter titles must match exactly, e.g. "Austria" isn't "Australia"
+DISAMBIGUATION = re.compile(r"^(.*\S)\s*\([^()]+\)$")  # "Mercury (planet)"
+
+
+def one_edit_apart(a, b):
+    """Whether two different strings differ by a single inserted, deleted or replaced character."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    for i, (char_a, char_b) in enumerate(zip(a, b)):
+        if char_a != char_b:
+            return a[i + (len(a) == len(b)):] == b[i + 1:]
+    return True
+
+
+def normalize_title(title):
+    """Lowercases a title and strips accents, punctuation and repeated spaces."""
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    title = re.sub(r"[^\w\s]", " ", title.lower().replace("_", " "))
+    return " ".join(title.split())
+
+
+class WikiIndex:
+    """Read-only view of an index built by `build_index`, memory-mapped so lookups only touch the pages they need."""
+
+    def __init__(self, path):
+        self.path = path
+        self._files = [open(os.path.join(path, name), "rb") for name in ("index.bin", "keys.bin", "summaries.bin")]
+        self.index, self.keys, self.summaries = (
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(file.fileno()).st_size else b""  ## Empty files can't be mapped.
+            for file in self._files
+        )
+        if len(self.index) < HEADER.size or HEADER.unpack_from(self.index, 0)[0] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Wikipedia index.")
+        self.count = HEADER.unpack_from(self.index, 0)[1]
+        if len(self.index) < HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path}/index.bin is truncated.")
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, i):
+        return RECORD.unpack_from(self.index, HEADER.size + i * RECORD.size)
+
+    def _key(self, i):
+        key_offset, key_length, _, _ = self._record(i)
+        return self.keys[key_offset:key_offset + key_length].decode("utf-8")
+
+    def _page(self, i):
+        _, _, summary_offset, summary_length = self._record(i)
+        title, _, summary = self.summaries[summary_offset:summary_offset + summary_length].decode("utf-8").partition("\n")
+        return {"title": title, "extract": summary}
+
+    def _bisect(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, title):
+        """Returns the page for the title as {"title", "extract"}, or None.
+
+        Titles are compared normalized, and a title is also found by its disambiguated pages,
+        e.g. "Mercury" finds "Mercury (planet)". On a miss, a neighbouring title one typo away
+        is accepted if both have at least `MIN_FUZZY_LENGTH` characters. Anything else is a
+        miss, so the caller can ask the live API instead of getting the wrong page.
+        """
+        key = normalize_title(title)
+        if not key or not self.count:
+            return None
+
+        position = self._bisect(key)
+        if position < self.count and self._key(position) == key:
+            return self._page(position)
+
+        if len(key) >= MIN_FUZZY_LENGTH:
+            for i in range(max(position - FUZZY_WINDOW, 0), min(position + FUZZY_WINDOW, self.count)):
+                candidate = self._key(i)
+                if len(candidate) >= MIN_FUZZY_LENGTH and one_edit_apart(key, candidate):
+                    return self._page(i)
+        return None
+
+    def close(self):
+        for view in (self.index, self.keys, self.summaries):
+            if isinstance(view, mmap.mmap):
+                view.close()
+        for file in self._files:
+            file.close()
+
+
+def read_pages(path):
+    """Yields (title, summary) from an abstracts XML dump or a JSON lines file, optionally gzipped."""
+    opener = gzip.open if path.endswith(".gz") else open
+    if ".json" in path:
+        with opener(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    page = json.loads(line)
+                    yield page.get("title", ""), page.get("abstract") or page.get("extract") or ""
+        return
+
+    with opener(path, "rb") as file:
+        for _, element in ElementTree.iterparse(file, events=("end",)):
+            if element.tag == "doc":
+                title = (element.findtext("title") or "").removeprefix("Wikipedia: ")
+                yield title, element.findtext("abstract") or ""
+                element.clear()
+
+
+def build_index(pages, out, titles=None, limit=None):
+    """Writes an index of the (title, summary) pages to the `out` folder and returns the number of pages.
+
+    With `titles`, only pages whose normalized title (or title without its disambiguation) is
+    in the set are kept. The first page of each normalized title wins, and a page titled e.g.
+    "Mercury" wins over the first disambiguated page, e.g. "Mercury (planet)", for "mercury".
+    """
+    os.makedirs(out, exist_ok=True)
+    entries, aliases = {}, {}
+    with open(os.path.join(out, "summaries.bin"), "wb") as summaries:
+        for title, summary in pages:
+            key = normalize_title(title)
+            summary = " ".join(summary.split())
+            if not key or not summary or summary.startswith(("|", "{")) or key in entries:
+                continue
+            disambiguation = DISAMBIGUATION.match(title)
+            base_key = normalize_title(disambiguation.group(1)) if disambiguation else None
+            if titles is not None and key not in titles and base_key not in titles:
+                continue
+            record = f"{title}\n{summary}".encode("utf-8")
+            entries[key] = (summaries.tell(), len(record))
+            if base_key:
+                aliases.setdefault(base_key, entries[key])
+            summaries.write(record)
+            if limit and len(entries) >= limit:
+                break
+
+    count = len(entries)
+    for key, entry in aliases.items():
+        entries.setdefault(key, entry)
+
+    with open(os.path.join(out, "keys.bin"), "wb") as keys, open(os.path.join(out, "index.bin"), "wb") as index:
+        index.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            encoded = key.encode("utf-8")
+            index.write(RECORD.pack(keys.tell(), len(encoded), *entries[key]))
+            keys.write(encoded)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds or queries the local Wikipedia index of the Wiki tool.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build an index from an abstracts dump or JSON lines.")
+    build.add_argument("dump", help="enwiki-latest-abstract.xml[.gz] or a .jsonl[.gz] file with title and abstract.")
+    build.add_argument("--out", default="wiki_index", help="Folder to write the index to.")
+    build.add_argument("--titles", help="File with one title per line; only these pages are kept.")
+    build.add_argument("--limit", type=int, help="Maximum number of pages to keep.")
+    lookup = commands.add_parser("lookup", help="Look a title up in an index.")
+    lookup.add_argument("index", help="Folder of the index.")
+    lookup.add_argument("title")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        titles = None
+        if args.titles:
+            with open(args.titles, encoding="utf-8") as file:
+                titles = {normalize_title(line) for line in file if line.strip()}
+        start_time = time.perf_counter()
+        count = build_index(read_pages(args.dump), args.out, titles, args.limit)
+        print(f"Indexed {count} pages in {args.out} in {time.perf_counter() - start_time:.1f} seconds.")
+    else:
+        index = WikiIndex(args.index)
+        start_time = time.perf_counter()
+        page = index.lookup(args.title)
+        elapsed = time.perf_counter() - start_time
+        print(f"{page['title']}: {page['extract']}" if page else f"No page found for '{args.title}'.")
+        print(f"Lookup took {elapsed * 1000:.3f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+## Scripted ReAct transcripts. The first script whose keyword is in the user query is replayed,
+## one assistant turn per call, so the agent walks through the whole chain.
+DEFAULT_SCRIPTS = [
+    ("compare", [
+        "Thought: I should look for the weather in both cities at the same time.\nAction: weather: London\nAction: weather: Paris\nPAUSE",
+        "Thought: I should also check what Paris is known for.\nAction: wikipedia: Paris\nPAUSE",
+        "Final Answer: London is colder than Paris today, and Paris is the capital of France.",
+    ]),
+    ("weather", [
+        "Thought: I should look for the weather in Buenos Aires.\nAction: weather: Buenos Aires\nPAUSE",
+        "Final Answer: It is 21°C and clear in Buenos Aires.",
+    ]),
+    ("who", [
+        "Thought: I should search the web for this.\nAction: websearch: F1 champion 2024\nPAUSE",
+        "Thought: I should confirm it on wikipedia.\nAction: wikipedia: Max Verstappen\nPAUSE",
+        "Final Answer: Max Verstappen won the 2024 Formula 1 championship.",
+    ]),
+]
+DEFAULT_ANSWER = ["Final Answer: Hello! How can I help you today?"]
+SUMMARY = "The user asked about the weather, Formula 1 and some cities, and the assistant answered each question."
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class MockLLMServer:
+    """Local OpenAI-compatible chat completions server replaying scripted ReAct transcripts.
+
+    `latency` is added to every call before the first token and `token_delay` after each
+    streamed token, so the agent can be measured without network access.
+    """
+
+    def __init__(self, latency=0.2, token_delay=0.0, scripts=None, port=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.scripts = scripts or DEFAULT_SCRIPTS
+        self.calls = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reply(self, messages):
+        """Returns the scripted content for the request."""
+        if len(messages) == 1 and ("Chat History:" in messages[0]["content"] or "Summary:" in messages[0]["content"]):
+            return SUMMARY  ## Summaries and condensed summaries
+
+        last_user = max(i for i, message in enumerate(messages) if message["role"] == "user")
+        step = sum(message["role"] == "assistant" for message in messages[last_user:])
+        query = messages[last_user]["content"].lower()
+
+        turns = next((turns for keyword, turns in self.scripts if keyword in query), DEFAULT_ANSWER)
+        return turns[min(step, len(turns) - 1)]
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                mock.calls += 1
+                content = mock.reply(body["messages"])
+                usage = {
+                    "prompt_tokens": sum(estimate_tokens(message["content"]) for message in body["messages"]),
+                    "completion_tokens": estimate_tokens(content),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                time.sleep(mock.latency)
+
+                if body.get("stream"):
+                    self.stream(body["model"], content, usage)
+                else:
+                    self.respond(body["model"], content, usage)
+
+            def respond(self, model, content, usage):
+                payload = json.dumps({
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def stream(self, model, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(data):
+                    chunk = f"data: {data}\n\n".encode()
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.flush()
+
+                base = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+                for token in content.split(" "):
+                    send(json.dumps({**base, "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}]}))
+                    time.sleep(mock.token_delay)
+                send(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+                send(json.dumps({**base, "choices": [], "usage": usage}))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
@@ -0,0 +1,38 @@
+import time
+from AgentTools.base_tool import BaseTool
+
+
+class MockTool(BaseTool):
+    """Stand-in for a remote tool: sleeps for `latency` seconds and returns a canned result."""
+
+    def __init__(self, name, description, result, latency=0.3, cache_ttl=0):
+        super().__init__(name=name, description=description, cache_ttl=cache_ttl)
+        self.result = result
+        self.latency = latency
+        self.calls = 0
+
+    def use(self, query):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.result.format(query=query)
+
+
+def mock_tools(latency=0.3, cache_ttl=0):
+    """Returns stub versions of the Wiki, Searcher and Weather tools."""
+    return [
+        MockTool(
+            "wikipedia", "Gets information from a Wikipedia entry. Specific Wikipedia input. e.g. 'Cristiano Ronaldo'.",
+            "{query}: {query} is a well known topic with a long history.",
+            latency, cache_ttl
+        ),
+        MockTool(
+            "websearch", "Search the web for information. Input is a query. e.g. 'Champion of the 2024 Champions League'.",
+            "[1] {query} (https://example.com): Results about {query}.",
+            latency, cache_ttl
+        ),
+        MockTool(
+            "weather", "Fetches weather information for a given city. Input is only the name of the city. e.g. 'London'.",
+            "The temperature in {query} is 21°C. The weather is clear sky. The humidity is 60%. The wind speed is 4.1 m/s.",
+            latency, cache_ttl
+        ),
+    ]
@@ -0,0 +1,166 @@
+"""Offline benchmark of the agent against a mock LLM server and mock tools.
+
+Run from the Agent folder:
+    python -m Benchmarks.run --scenario all --llm-latency 0.2 --tool-latency 0.3 --concurrency 20
+
+Scenarios:
+    long_conversation  one session crossing the summary threshold many times
+    multi_tool_chain   queries needing several tool calls and iterations
+    concurrent_chat    concurrent POST /chat requests against the FastAPI app
+"""
+import argparse
+import os
+import resource
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from Benchmarks.mock_llm import MockLLMServer
+from Benchmarks.mock_tools import mock_tools
+
+
+QUERIES = [
+    "What is the weather in Buenos Aires?",
+    "Who won the F1 2024?",
+    "Compare the weather in London and Paris",
+    "Hello!",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name, latencies, elapsed, **extra):
+    """Prints throughput, latency percentiles and memory of a scenario."""
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"\n== {name} ==")
+    print(f"Requests: {len(latencies)}, throughput: {len(latencies) / elapsed:.2f} req/s")
+    print(
+        f"Latency p50: {percentile(latencies, 0.50):.4f}s  p95: {percentile(latencies, 0.95):.4f}s  "
+        f"p99: {percentile(latencies, 0.99):.4f}s  max: {max(latencies):.4f}s"
+    )
+    print(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB, max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    for key, value in extra.items():
+        print(f"{key}: {value}")
+
+
+def new_agent(args):
+    from agent import Agent
+    agent = Agent()
+    for tool in mock_tools(args.tool_latency):
+        agent.register_tool(tool)
+    return agent
+
+
+def long_conversation(args, llm):
+    """A single session with many turns and a small token budget, so summaries keep triggering."""
+    agent = new_agent(args)
+    agent.max_messages_tokens = 1500
+    agent.summary_soft_tokens = 1000
+
+    latencies = []
+    start_time = time.perf_counter()
+    for i in range(args.turns):
+        turn_start = time.perf_counter()
+        agent.execute(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - turn_start)
+    report(
+        "long_conversation", latencies, time.perf_counter() - start_time,
+        **{"History tokens at the end": agent.history_tokens, "Summary characters": len(agent.old_chats_summary)}
+    )
+
+
+def multi_tool_chain(args, llm):
+    """Fresh sessions answering questions that need two or three tool iterations."""
+    base_agent = new_agent(args)
+    calls_before = llm.calls
+
+    latencies = []
+    start_time = time.perf_counter()
+    for i in range(args.requests):
+        agent = base_agent.spawn()
+        turn_start = time.perf_counter()
+        agent.execute(QUERIES[i % 3])
+        latencies.append(time.perf_counter() - turn_start)
+    report(
+        "multi_tool_chain", latencies, time.perf_counter() - start_time,
+        **{"LLM calls per request": f"{(llm.calls - calls_before) / args.requests:.2f}"}
+    )
+
+
+def concurrent_chat(args, llm):
+    """Concurrent /chat requests from distinct sessions against the FastAPI app under uvicorn."""
+    import requests
+    import uvicorn
+    import app as app_module
+
+    app_module.agent.tools.clear()
+    for tool in mock_tools(args.tool_latency):
+        app_module.agent.register_tool(tool)
+
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    http = requests.Session()
+    http.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    def post(i):
+        turn_start = time.perf_counter()
+        response = http.post(
+            f"http://127.0.0.1:{args.port}/chat",
+            json={"query": QUERIES[i % len(QUERIES)], "session_id": uuid.uuid4().hex}
+        )
+        return time.perf_counter() - turn_start, response.status_code
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(post, range(args.requests)))
+    elapsed = time.perf_counter() - start_time
+
+    server.should_exit = True
+    thread.join()
+    errors = sum(status != 200 for _, status in results)
+    report("concurrent_chat", [latency for latency, _ in results], elapsed, **{"Concurrency": args.concurrency, "Errors": errors})
+
+
+SCENARIOS = {
+    "long_conversation": long_conversation,
+    "multi_tool_chain": multi_tool_chain,
+    "concurrent_chat": concurrent_chat,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the ReAct agent.")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds before the mock LLM answers.")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens.")
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="Seconds each mock tool takes.")
+    parser.add_argument("--turns", type=int, default=40, help="Turns of the long conversation.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests of the other scenarios.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Parallel clients of concurrent_chat.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the FastAPI app under test.")
+    args = parser.parse_args()
+
+    llm = MockLLMServer(latency=args.llm_latency, token_delay=args.token_delay).start()
+    os.environ["DEEPSEEK_BASE_URL"] = llm.base_url
+    os.environ["DEEPSEEK_API_KEY"] = "mock"
+    if not os.getenv("TOKENIZER_PATH"):
+        os.environ.setdefault("TOKENIZER_APPROXIMATE", "1")  ## Keeps the benchmark fully offline.
+
+    tracemalloc.start()
+    for name, scenario in SCENARIOS.items():
+        if args.scenario in ("all", name):
+            tracemalloc.reset_peak()
+            scenario(args, llm)
+    llm.stop()
+
+
+if __name__ == "__main__":
+    main()
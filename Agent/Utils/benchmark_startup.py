@@ -0,0 +1,33 @@
+"""Measures the import time of `agent` and the cold start of the tokenizer.
+
+Run from the Agent folder: python -m Utils.benchmark_startup
+Set TOKENIZER_PATH, TOKENIZER_OFFLINE or TOKENIZER_APPROXIMATE to compare the backends.
+"""
+import subprocess
+import sys
+import time
+
+
+def time_in_fresh_process(code):
+    """Returns the seconds a snippet takes in a new interpreter, so no module is cached."""
+    script = f"import time\nstart_time = time.perf_counter()\n{code}\nprint(time.perf_counter() - start_time)"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+import_time = time_in_fresh_process("from agent import Agent")
+cold_start = time_in_fresh_process(
+    "from Utils.tokenizer import get_tokenizer_service\n"
+    "get_tokenizer_service().count_text('Hello, how are you?')"
+)
+
+from Utils.tokenizer import get_tokenizer_service
+service = get_tokenizer_service()
+service.count_text("Hello, how are you?")
+warm_call_start = time.perf_counter()
+service.count_text("Hello, how are you?")
+warm_call = time.perf_counter() - warm_call_start
+
+print(f"Import of Agent: {import_time:.4f} seconds. ⏱️")
+print(f"Tokenizer cold start (first count): {cold_start:.4f} seconds. ⏱️")
+print(f"Tokenizer warm count: {warm_call:.6f} seconds. ⏱️")
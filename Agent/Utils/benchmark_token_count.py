@@ -0,0 +1,39 @@
+"""Compares re-tokenizing the whole history every turn with the cached per-message counts.
+
+Run from the Agent folder: python -m Utils.benchmark_token_count
+"""
+import time
+from types import SimpleNamespace
+from agent import Agent
+
+
+TURNS = 200
+
+## The benchmark never calls DeepSeek, so the clients are left as placeholders.
+agent = Agent(client=SimpleNamespace(), async_client=SimpleNamespace())
+
+turn = [
+    ("user", "What is the weather in Buenos Aires and who won the last Formula 1 championship?"),
+    ("assistant", "Thought: I should look for the weather in Buenos Aires.\nAction: weather: Buenos Aires\nPAUSE"),
+    ("tool", "Observation from weather: The temperature in Buenos Aires is 21°C. The weather is clear sky. The humidity is 60%. The wind speed is 4.1 m/s."),
+    ("assistant", "Final Answer: It is 21°C and clear in Buenos Aires."),
+]
+
+full_retokenize = 0.0
+running_sum = 0.0
+
+for i in range(TURNS):
+    start_time = time.perf_counter()
+    for role, content in turn:
+        agent.add_message(role, content)
+    running_sum += time.perf_counter() - start_time
+
+    ## Previous path: the whole history went through the chat template on every call.
+    start_time = time.perf_counter()
+    exact = agent.num_tokens_from_messages(agent.get_chat_history())
+    full_retokenize += time.perf_counter() - start_time
+
+print(f"Turns: {TURNS}, messages: {len(agent.messages)}")
+print(f"Tokens from the chat template: {exact}, from the running sum: {agent.history_tokens}")
+print(f"Re-tokenizing the history every turn: {full_retokenize:.4f} seconds. ⏱️")
+print(f"Counting each message once when added: {running_sum:.4f} seconds. ⏱️")
@@ -0,0 +1,199 @@
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+from Utils.metrics import metrics
+
+
+class ConversationStore(ABC):
+    """Abstract base class for the stores keeping conversations outside the process.
+
+    A stored conversation is its summary plus the messages not summarized yet, in order,
+    each with the token count computed when it was added and an id given by the store.
+    """
+
+    @abstractmethod
+    def append(self, session_id, message):
+        """Adds a message at the end of the conversation and sets its `id`."""
+        pass
+
+    @abstractmethod
+    def summarize(self, session_id, summary, message_ids):
+        """Replaces the summary and drops the messages it now covers, given by id."""
+        pass
+
+    @abstractmethod
+    def load(self, session_id, max_tokens):
+        """Returns (summary, [(role, content, tokens, id)]) with the newest messages fitting in `max_tokens`.
+
+        Older messages are kept in the store, they just aren't loaded.
+        """
+        pass
+
+    @abstractmethod
+    def last_message_id(self, session_id):
+        """Returns the id of the last message of the conversation, or None if it has none.
+
+        A worker whose history doesn't end with it is behind another worker and should load the conversation again.
+        """
+        pass
+
+    def flush(self):
+        """Waits until every pending write is stored."""
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation store backed by a SQLite file, which several workers can share.
+
+    Writes go to a queue and a background thread stores them in batches, one transaction
+    per batch, so turns never wait for the disk. Message ids are generated here, so they are
+    known before the message is written.
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval=0.05):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # Seconds the writer waits for more writes before committing
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS conversations (session_id TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS messages (seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL, message_id TEXT)"
+        )
+        if "message_id" not in [column[1] for column in self.db.execute("PRAGMA table_info(messages)")]:
+            self.db.execute("ALTER TABLE messages ADD COLUMN message_id TEXT")  ## Stores written before ids existed.
+            self.db.execute("UPDATE messages SET message_id = CAST(seq AS TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq)")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.pending = {}  # session id -> writes queued and not stored yet
+        self.pending_lock = threading.Lock()  ## Not `lock`, which the writer holds while on disk.
+        self.writes = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def append(self, session_id, message):
+        message.id = uuid.uuid4().hex
+        self._put(("append", session_id, message.role, message.content, message.tokens, message.id))
+
+    def summarize(self, session_id, summary, message_ids):
+        self._put(("summarize", session_id, summary, list(message_ids)))
+
+    def last_message_id(self, session_id):
+        with self.pending_lock:
+            pending = self.pending.get(session_id)
+        if pending:
+            self.flush()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT message_id FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id, max_tokens):
+        self.flush()
+        with self.lock:
+            row = self.db.execute("SELECT summary FROM conversations WHERE session_id = ?", (session_id,)).fetchone()
+            rows = self.db.execute(
+                "SELECT role, content, tokens, message_id FROM messages WHERE session_id = ? ORDER BY seq DESC", (session_id,)
+            )
+            window, tokens = [], 0
+            for message in rows:
+                if tokens + message[2] > max_tokens:
+                    break
+                window.append(message)
+                tokens += message[2]
+
+        ## The window starts at a user message, so a turn is never cut in half.
+        while window and window[-1][0] != "user":
+            window.pop()
+
+        metrics.inc("agent_conversations_hydrated_total")
+        return (row[0] if row else ""), window[::-1]
+
+    def flush(self):
+        self.writes.join()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
+
+    def _put(self, write):
+        with self.pending_lock:
+            self.pending[write[1]] = self.pending.get(write[1], 0) + 1
+        self.writes.put(write)
+
+    def _write_loop(self):
+        while True:
+            batch = [self.writes.get()]
+            try:
+                batch.append(self.writes.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.writes.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                with self.lock:
+                    with self.db:
+                        for write in batch:
+                            self._apply(*write)
+                metrics.inc("agent_conversation_writes_total", len(batch))
+                metrics.inc("agent_conversation_batches_total")
+            except Exception as e:
+                print(f"An error occurred while storing conversations: {e}")
+            finally:
+                with self.pending_lock:
+                    for write in batch:
+                        self.pending[write[1]] -= 1
+                        if not self.pending[write[1]]:
+                            del self.pending[write[1]]
+                for _ in batch:
+                    self.writes.task_done()
+
+    def _apply(self, kind, session_id, *args):
+        if kind == "append":
+            self.db.execute(
+                "INSERT INTO messages (session_id, role, content, tokens, message_id) VALUES (?, ?, ?, ?, ?)", (session_id, *args)
+            )
+        else:
+            summary, message_ids = args
+            self.db.execute(
+                "INSERT INTO conversations (session_id, summary) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary",
+                (session_id, summary)
+            )
+            self.db.execute(
+                f"DELETE FROM messages WHERE session_id = ? AND message_id IN ({', '.join('?' * len(message_ids))})",
+                (session_id, *message_ids)
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Returns the process-wide conversation store set by CONVERSATION_STORE_PATH, or None to keep conversations in memory."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                load_dotenv()
+                path = os.getenv("CONVERSATION_STORE_PATH")
+                if not path:
+                    return None
+                _store = SQLiteConversationStore(
+                    path,
+                    batch_size=int(os.getenv("CONVERSATION_STORE_BATCH", 256))
+                )
+    return _store
@@ -0,0 +1,50 @@
+import re
+import threading
+import zlib
+
+
+HASHED_DIMENSIONS = 512
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in is it its me my
+no not of on or our so than that the their them then there these they this to us was we were what when where
+which who whom why will with would you your user assistant answer final
+""".split())  # Left out of the hashed embeddings, so sharing them doesn't make texts similar
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_embedding_model(model_name):
+    """Returns the CPU SentenceTransformer for the name, loaded once per process, or None if unavailable."""
+    if not model_name:
+        return None
+    with _models_lock:
+        if model_name not in _models:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _models[model_name] = SentenceTransformer(model_name, device="cpu")
+            except Exception as e:
+                print(f"Embedding model {model_name} unavailable: {e}")
+                _models[model_name] = None
+        return _models[model_name]
+
+
+def embed(texts, model_name=None):
+    """Returns the normalized embeddings of the texts as the rows of a numpy matrix.
+
+    Without an embedding model, the texts are embedded as hashed bags of words without
+    stopwords, which is enough to rank them by the words they share with a query.
+    """
+    import numpy as np
+
+    model = get_embedding_model(model_name)
+    if model is not None:
+        return np.asarray(model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+    vectors = np.zeros((len(texts), HASHED_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            if word not in STOPWORDS:
+                vectors[row, zlib.crc32(word.encode()) % HASHED_DIMENSIONS] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from Utils.metrics import metrics
+
+
+## Lower values are served first.
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class GatewayOverloaded(Exception):
+    """Raised when a call would wait in the gateway queue past its deadline."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"The LLM gateway is overloaded ({reason}), retry in {retry_after:.0f}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LLMGateway:
+    """Admission control in front of the LLM API, shared by every agent of the process.
+
+    At most `max_concurrency` calls run at once; the rest wait in a queue ordered by
+    priority, so interactive turns go before background summaries. A token bucket refilled
+    at `tokens_per_minute` (0 disables it) is charged with the estimated prompt tokens of
+    every call. Calls that would wait longer than `queue_timeout` are shed with
+    GatewayOverloaded instead of piling up.
+    """
+
+    def __init__(self, max_concurrency=8, tokens_per_minute=0, queue_timeout=10):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_second = tokens_per_minute / 60
+        self.bucket_size = tokens_per_minute
+        self.bucket = tokens_per_minute
+        self.refilled_at = time.monotonic()
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters = []  # Heap of [priority, order, loop, future, granted]
+        self.order = itertools.count()
+        self.call_seconds = 1.0  # Moving average of the duration of a call, to predict queue waits
+        self.lock = threading.Lock()
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens, priority="interactive", call="chat"):
+        """Waits for a slot and for the token bucket, holding the slot until the block exits."""
+        queued_at = time.monotonic()
+        deadline = queued_at + self.queue_timeout
+        await self._acquire(PRIORITIES[priority], deadline, call)
+        started_at = None
+        try:
+            await self._take_tokens(estimated_tokens, deadline, call)
+            started_at = time.monotonic()
+            metrics.observe("agent_llm_queue_seconds", started_at - queued_at, call=call)
+            yield
+        finally:
+            self._release(time.monotonic() - started_at if started_at else None)
+
+    async def _acquire(self, priority, deadline, call):
+        with self.lock:
+            if self.active < self.max_concurrency and not self.waiters:
+                self.active += 1
+                self._report()
+                return
+
+            ahead = sum(1 for waiter in self.waiters if waiter[0] <= priority)
+            expected_wait = (ahead + 1) / self.max_concurrency * self.call_seconds
+            if time.monotonic() + expected_wait > deadline:
+                self._shed("queue", expected_wait, call)
+
+            loop = asyncio.get_running_loop()
+            waiter = [priority, next(self.order), loop, loop.create_future(), False]
+            heapq.heappush(self.waiters, waiter)
+            self._report()
+
+        try:
+            await asyncio.wait_for(waiter[3], timeout=max(deadline - time.monotonic(), 0))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self.lock:
+                granted = waiter[4]
+                if not granted:
+                    self.waiters.remove(waiter)
+                    heapq.heapify(self.waiters)
+                    self._report()
+            if isinstance(e, asyncio.CancelledError):
+                if granted:
+                    self._release(None)  ## The slot was handed over while being cancelled.
+                raise
+            if not granted:
+                self._shed("timeout", self.call_seconds, call)
+
+    async def _take_tokens(self, tokens, deadline, call):
+        """Reserves the tokens in the bucket, sleeping until the bucket has refilled enough."""
+        if not self.tokens_per_second:
+            return
+        tokens = min(tokens, self.bucket_size)
+        with self.lock:
+            now = time.monotonic()
+            self.bucket = min(self.bucket + (now - self.refilled_at) * self.tokens_per_second, self.bucket_size)
+            self.refilled_at = now
+            wait = max(tokens - self.bucket, 0) / self.tokens_per_second
+            if now + wait > deadline:
+                self._shed("rate", wait, call)
+            self.bucket -= tokens
+        if wait:
+            await asyncio.sleep(wait)
+
+    def _release(self, duration):
+        """Hands the slot to the first waiter, or frees it."""
+        with self.lock:
+            if duration is not None:
+                self.call_seconds = 0.8 * self.call_seconds + 0.2 * duration
+            if self.waiters:
+                waiter = heapq.heappop(self.waiters)
+                waiter[4] = True
+                waiter[2].call_soon_threadsafe(_wake, waiter[3])
+            else:
+                self.active -= 1
+            self._report()
+
+    def _shed(self, reason, retry_after, call):
+        metrics.inc("agent_llm_shed_total", call=call, reason=reason)
+        raise GatewayOverloaded(reason, retry_after)
+
+    def _report(self):
+        for name, priority in PRIORITIES.items():
+            metrics.set("agent_llm_queue_depth", sum(1 for waiter in self.waiters if waiter[0] == priority), priority=name)
+        metrics.set("agent_llm_active_calls", self.active)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    """Returns the process-wide gateway, configured from the LLM_* variables."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                load_dotenv()
+                _gateway = LLMGateway(
+                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+                    tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", 0)),
+                    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", 10))
+                )
+    return _gateway
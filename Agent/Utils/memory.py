@@ -0,0 +1,67 @@
+import threading
+from Utils.embeddings import embed
+
+
+class MemoryArchive:
+    """Old turns of a conversation, searchable by similarity to a query.
+
+    Turns are archived when they are summarized out of the history. Their normalized
+    embeddings are the rows of a numpy matrix, so a search is one matrix-vector product.
+    Past `max_entries` the oldest turns are forgotten. Searches only return turns at least
+    `min_score` similar to the query, so unrelated questions recall nothing.
+    """
+
+    def __init__(self, model_name=None, max_entries=1000, min_score=0.25):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.min_score = min_score
+        self.texts = []
+        self.vectors = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def nbytes(self):
+        return sum(len(text) for text in self.texts) + (self.vectors.nbytes if self.vectors is not None else 0)
+
+    def embed(self, texts):
+        return embed(texts, self.model_name)
+
+    def add(self, texts, vectors):
+        """Archives texts with their embeddings, as returned by `embed`."""
+        import numpy as np
+
+        with self.lock:
+            self.texts.extend(texts)
+            self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+            if len(self.texts) > self.max_entries:
+                del self.texts[:-self.max_entries]
+                self.vectors = self.vectors[-self.max_entries:]
+
+    def search(self, query, k=3):
+        """Returns up to `k` archived texts similar enough to the query, most similar first."""
+        if not self.texts:
+            return []
+        vector = self.embed([query])[0]
+        with self.lock:
+            scores = self.vectors @ vector
+            found = []
+            for i in scores.argsort()[::-1]:
+                if len(found) == k or scores[i] < self.min_score:
+                    break
+                if self.texts[i] not in found:  ## Repeated questions are archived once per time they were asked.
+                    found.append(self.texts[i])
+            return found
+
+
+def archive_turns(messages, max_chars=600):
+    """Returns one text per turn of the messages: the user query and the last answer to it."""
+    turns = []
+    for message in messages:
+        if message.role == "user":
+            turns.append([message.content, ""])
+        elif message.role == "assistant" and turns:
+            turns[-1][1] = message.content
+    return [f"User: {query}\nAssistant: {answer}"[:max_chars] for query, answer in turns]
@@ -0,0 +1,200 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class Metrics:
+    """Process-wide counters, gauges and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        """Adds to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Sets a gauge."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """Records a value in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(values.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Span:
+    """A timed stage of a request. Nested stages are kept as children."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def self_duration(self):
+        """Time spent in the span itself, excluding its children."""
+        return max(self.duration - sum(child.duration for child in self.children), 0.0)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            **({"attributes": self.attributes} if self.attributes else {}),
+            "duration": round(self.duration, 6),
+            "self_duration": round(self.self_duration, 6),
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class Trace:
+    """The tree of spans recorded for one request."""
+
+    def __init__(self):
+        self.spans = []
+
+    def to_dict(self):
+        return [span.to_dict() for span in self.spans]
+
+
+current_span = ContextVar("current_span", default=None)
+current_trace = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def trace():
+    """Collects the spans recorded inside the block into a Trace."""
+    request_trace = Trace()
+    token = current_trace.set(request_trace)
+    try:
+        yield request_trace
+    finally:
+        current_trace.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Records a stage as a child of the current span.
+
+    Both the total and the self time (excluding nested stages) go to histograms, so
+    recursive stages are not double counted.
+    """
+    parent = current_span.get()
+    stage = Span(name, attributes)
+    token = current_span.set(stage)
+    try:
+        yield stage
+    finally:
+        stage.end = time.perf_counter()
+        current_span.reset(token)
+        if parent is not None:
+            parent.children.append(stage)
+        elif current_trace.get() is not None:
+            current_trace.get().spans.append(stage)
+        metrics.observe("agent_stage_seconds", stage.duration, stage=name)
+        metrics.observe("agent_stage_self_seconds", stage.self_duration, stage=name)
+
+
+def timeit(func):
+    """Decorator recording the execution time of a function as a span named after it."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def atimed(*args, **kwargs):
+            with span(func.__name__):
+                return await func(*args, **kwargs)
+        return atimed
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return timed
+
+
+def record_usage(usage, call):
+    """Adds the token usage reported by the LLM API to the counters."""
+    if usage is None:
+        return
+    metrics.inc("agent_llm_requests_total", call=call)
+    metrics.inc("agent_llm_prompt_tokens_total", usage.prompt_tokens or 0, call=call)
+    metrics.inc("agent_llm_completion_tokens_total", usage.completion_tokens or 0, call=call)
+    cached_tokens = prompt_cache_hit_tokens(usage)
+    metrics.inc("agent_llm_prompt_cache_hit_tokens_total", cached_tokens, call=call)
+    stage = current_span.get()
+    if stage is not None:
+        stage.attributes["prompt_tokens"] = usage.prompt_tokens
+        stage.attributes["prompt_cache_hit_tokens"] = cached_tokens
+        stage.attributes["completion_tokens"] = usage.completion_tokens
+
+
+def prompt_cache_hit_tokens(usage):
+    """Returns the prompt tokens served from the provider's prefix cache.
+
+    DeepSeek reports them as `prompt_cache_hit_tokens`, OpenAI-style APIs in `prompt_tokens_details`.
+    """
+    hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    if hit_tokens is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        hit_tokens = getattr(details, "cached_tokens", None)
+    return hit_tokens or 0
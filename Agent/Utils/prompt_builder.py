@@ -0,0 +1,34 @@
+from datetime import datetime
+
+
+class PromptBuilder:
+    """Assembles the messages sent to DeepSeek so that every request starts with the same bytes.
+
+    DeepSeek caches the longest common prefix of recent requests. The system prompt depends
+    only on the tools and the day, so it is identical for every session until midnight. The
+    parts that change (the summary of old chats and the history) come after it, and the
+    earlier turns recalled for the current query come last.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self._key = None
+        self._prompt = None
+
+    def system_prompt(self, tools):
+        """Returns the system prompt for the tools and today's date, rebuilt only when they change."""
+        key = (tools, datetime.now().strftime("%Y-%m-%d"))
+        if key != self._key:
+            self._key = key
+            self._prompt = self.template.format(tools=tools, date=key[1])
+        return self._prompt
+
+    def build(self, system_prompt, summary, history, recalled=()):
+        """Returns the stable system prompt, then the summary of old chats, the history and the recalled turns."""
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": f"Old messages summary:\n{summary}"})
+        messages.extend(history)
+        if recalled:
+            messages.append({"role": "system", "content": "Earlier turns related to the question:\n" + "\n\n".join(recalled)})
+        return messages
@@ -0,0 +1,158 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from Utils.metrics import metrics
+from Utils.embeddings import get_embedding_model
+
+
+def normalize_query(query):
+    """Normalizes a user query so trivially different phrasings share an entry."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def query_signature(query):
+    """Returns the numbers and capitalized names of a query, which a semantic match must share.
+
+    Embeddings put "F1 2023" next to "F1 2024" and "London" next to "Londrina", so they
+    can't tell such queries apart. The first word is skipped as it is capitalized anyway.
+    """
+    words = re.findall(r"\w+", query)
+    return frozenset(
+        word.lower() for i, word in enumerate(words)
+        if any(char.isdigit() for char in word) or (i and word[0].isupper())
+    )
+
+
+class ResponseCache:
+    """Opt-in cache of final answers keyed on the scope, freshness class and normalized user query.
+
+    The scope is None for answers any session can be given and a session id for answers that
+    depended on that session's conversation. The freshness class names the tools the answer
+    used, so e.g. an answer from the weather tool doesn't replace one from Wikipedia, and each
+    entry expires after the TTL of its freshest tool, e.g. minutes for weather.
+
+    Lookups try an exact match first and then, when a model is configured and
+    `sentence-transformers` is installed, the most similar cached query by cosine similarity
+    of CPU embeddings, if it has the same numbers and names.
+    """
+
+    def __init__(self, max_entries=2048, default_ttl=86400, model_name=None, threshold=0.92):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.model_name = model_name
+        self.threshold = threshold
+        self.entries = OrderedDict()  # (scope, freshness, normalized query) -> (answer, signature, stored_at, expires_at)
+        self.classes = {}  # (scope, normalized query) -> freshness classes with an entry
+        self.keys = []  # entry keys, aligned with the rows of `vectors`
+        self.vectors = None
+        self.lock = threading.Lock()
+
+    def _embed(self, text):
+        """Returns the normalized embedding of the text, or None without an embedding model."""
+        model = get_embedding_model(self.model_name)
+        if model is None:
+            return None
+        return model.encode([text], normalize_embeddings=True)[0]
+
+    def lookup(self, query, scopes=(None,)):
+        """Returns the cached answer for the query in any of the scopes, or None.
+
+        Among the freshness classes cached for the query, the answer stored last wins.
+        """
+        normalized = normalize_query(query)
+        now = time.time()
+        with self.lock:
+            keys = [
+                (scope, freshness, normalized)
+                for scope in scopes for freshness in list(self.classes.get((scope, normalized), ()))
+            ]
+            fresh = [key for key in keys if self._fresh(key, now)]
+            if fresh:
+                key = max(fresh, key=lambda key: self.entries[key][2])
+                metrics.inc("agent_response_cache_hits_total", match="exact", freshness=key[1])
+                return self.entries[key][0]
+
+        vector = self._embed(normalized)
+        signature = query_signature(query)
+        with self.lock:
+            if vector is not None and self.vectors is not None:
+                scores = self.vectors @ vector
+                for row in scores.argsort()[::-1]:
+                    if scores[row] < self.threshold:
+                        break
+                    key = self.keys[row]
+                    if key[0] in scopes and self.entries[key][1] == signature and self._fresh(key, now):
+                        metrics.inc("agent_response_cache_hits_total", match="semantic", freshness=key[1])
+                        return self.entries[key][0]
+
+        metrics.inc("agent_response_cache_misses_total")
+        return None
+
+    def store(self, query, answer, ttl=None, freshness="static", scope=None):
+        """Caches the final answer of a query for `ttl` seconds."""
+        normalized = normalize_query(query)
+        key = (scope, freshness, normalized)
+        vector = self._embed(normalized)
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            self._remove(key)
+            self.entries[key] = (answer, query_signature(query), now, now + (ttl or self.default_ttl))
+            self.classes.setdefault((scope, normalized), set()).add(freshness)
+            if vector is not None:
+                import numpy as np
+                self.keys.append(key)
+                self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _fresh(self, key, now):
+        """Whether the key has an entry that hasn't expired. Expired entries are dropped."""
+        if key not in self.entries:
+            return False
+        if self.entries[key][3] <= now:
+            self._remove(key)
+            return False
+        return True
+
+    def _expire(self, now):
+        for key in [key for key, (_, _, _, expires_at) in self.entries.items() if expires_at <= now]:
+            self._remove(key)
+
+    def _remove(self, key):
+        if self.entries.pop(key, None) is None:
+            return
+        scope, freshness, normalized = key
+        classes = self.classes[(scope, normalized)]
+        classes.discard(freshness)
+        if not classes:
+            del self.classes[(scope, normalized)]
+        if key in self.keys:
+            import numpy as np
+            row = self.keys.index(key)
+            del self.keys[row]
+            self.vectors = np.delete(self.vectors, row, axis=0) if self.keys else None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Returns the process-wide response cache, configured from the RESPONSE_CACHE_* variables."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                load_dotenv()
+                _cache = ResponseCache(
+                    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 2048)),
+                    default_ttl=float(os.getenv("RESPONSE_CACHE_TTL", 86400)),
+                    model_name=os.getenv("RESPONSE_CACHE_MODEL") or None,  ## Semantic matching is off unless a model is set.
+                    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.92))
+                )
+    return _cache
@@ -0,0 +1,49 @@
+import time
+
+
+## How each budget is named in the message shown to the user when it runs out.
+BUDGET_NAMES = {
+    "iterations": "number of iterations",
+    "time": "time",
+    "tokens": "number of tokens",
+    "tool_calls": "number of tool calls",
+}
+
+
+class RunState:
+    """State of a single query going through the ReAct loop, with the budgets it may use."""
+
+    def __init__(self, query, max_iterations=5, max_seconds=60, max_tokens=60000, max_tool_calls=8, is_cancelled=None, stream=False):
+        self.query = query
+        self.stream = stream  # Whether model tokens are emitted as they arrive
+        self.steps = []  # Messages added to the history by this run, in order
+        self.iteration = 0
+        self.max_iterations = max_iterations
+        self.deadline = time.monotonic() + max_seconds
+        self.tokens_used = 0
+        self.max_tokens = max_tokens
+        self.tool_calls = 0
+        self.tools_used = set()
+        self.max_tool_calls = max_tool_calls
+        self.is_cancelled = is_cancelled  # Optional coroutine function telling whether the client went away
+        self.recalled = []  # Archived turns related to the query, added to every prompt of the run
+        self.used_context = False  # Whether earlier turns of the conversation were in the prompt
+        self.stop_reason = None
+
+    @property
+    def remaining_seconds(self):
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    @property
+    def remaining_tool_calls(self):
+        return max(self.max_tool_calls - self.tool_calls, 0)
+
+    def exhausted_budget(self):
+        """Returns the name of the first budget that ran out, or None."""
+        if self.iteration >= self.max_iterations:
+            return "iterations"
+        if self.remaining_seconds <= 0:
+            return "time"
+        if self.tokens_used >= self.max_tokens:
+            return "tokens"
+        return None
@@ -0,0 +1,193 @@
+import os
+import asyncio
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from dotenv import load_dotenv
+
+
+MODEL_NAME = "deepseek-ai/DeepSeek-V3"
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tokenizer_cache")
+
+## Special tokens the DeepSeek-V3 chat template puts around each message, used with the fast backend.
+ROLE_MARKERS = {
+    "system": "",
+    "user": "<｜User｜>",
+    "assistant": "<｜Assistant｜><｜end▁of▁sentence｜>",
+    "tool": "<｜tool▁outputs▁begin｜><｜tool▁output▁begin｜><｜tool▁output▁end｜><｜tool▁outputs▁end｜>",
+}
+BOS_TOKENS = 1
+CHARS_PER_TOKEN = 3.5
+
+
+class TokenizerService:
+    """Counts tokens for the agent, loading the tokenizer lazily on first use.
+
+    Backends, chosen from the environment:
+    - TOKENIZER_PATH: a pinned local tokenizer.json loaded with the fast `tokenizers` library.
+    - Otherwise the transformers AutoTokenizer, using only local files when TOKENIZER_OFFLINE is set.
+    - TOKENIZER_APPROXIMATE: skip the tokenizer and estimate tokens from the text length.
+
+    Batches are encoded with the batch API of the tokenizer. With TOKENIZER_WORKERS set, the
+    async methods send batches of at least TOKENIZER_POOL_MIN_CHARS characters to a pool of
+    worker processes, which write the counts to shared memory, so counting scales with cores.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, cache_dir=CACHE_DIR, tokenizer_path=None, offline=None, approximate=None, workers=None, pool_min_chars=None):
+        load_dotenv()
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.tokenizer_path = tokenizer_path or os.getenv("TOKENIZER_PATH") or None
+        self.offline = offline if offline is not None else os.getenv("TOKENIZER_OFFLINE", "") == "1"
+        self.approximate = approximate if approximate is not None else os.getenv("TOKENIZER_APPROXIMATE", "") == "1"
+        self.workers = workers if workers is not None else int(os.getenv("TOKENIZER_WORKERS", 0))
+        self.pool_min_chars = pool_min_chars if pool_min_chars is not None else int(os.getenv("TOKENIZER_POOL_MIN_CHARS", 20000))
+        self._tokenizer = None
+        self._lock = threading.Lock()
+        self._overheads = {}
+        self._pool = None
+
+    @property
+    def tokenizer(self):
+        """Returns the tokenizer, loading it the first time it is needed."""
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    self._tokenizer = self._load()
+        return self._tokenizer
+
+    @property
+    def is_fast_backend(self):
+        return self.tokenizer_path is not None
+
+    def _load(self):
+        if self.is_fast_backend:
+            from tokenizers import Tokenizer
+            return Tokenizer.from_file(self.tokenizer_path)
+
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(self.model_name, cache_dir=self.cache_dir, local_files_only=self.offline)
+
+    def approximate_count(self, text):
+        """Returns a cheap estimate of the tokens in the text."""
+        return int(len(text) / CHARS_PER_TOKEN) + 1 if text else 0
+
+    def count_text(self, text):
+        """Returns the number of tokens in the text, without special tokens."""
+        if self.approximate:
+            return self.approximate_count(text)
+        if self.is_fast_backend:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def count_texts(self, texts):
+        """Returns the number of tokens of each text, encoding them in a single batch."""
+        if self.approximate:
+            return [self.approximate_count(text) for text in texts]
+        if not texts:
+            return []
+        if self.is_fast_backend:
+            return [len(encoding.ids) for encoding in self.tokenizer.encode_batch(texts, add_special_tokens=False)]
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    async def acount_texts(self, texts):
+        """Async version of `count_texts`, off the event loop.
+
+        Large batches go to the worker processes if there are any, the rest to a thread. If the
+        pool fails, counting falls back to threads for the rest of the process.
+        """
+        if self.approximate or not texts:
+            return self.count_texts(texts)
+        if self.workers and sum(len(text) for text in texts) >= self.pool_min_chars:
+            try:
+                return await self._count_in_pool(texts)
+            except Exception as e:
+                print(f"Tokenizer workers disabled, counting in threads: {e}")
+                self.close()
+                self.workers = 0
+        return await asyncio.to_thread(self.count_texts, texts)
+
+    async def _count_in_pool(self, texts):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=get_context("spawn"),  ## Forking a process with running threads is unsafe.
+                        initializer=_init_worker,
+                        initargs=(self.model_name, self.cache_dir, self.tokenizer_path, self.offline)
+                    )
+
+        results = SharedMemory(create=True, size=len(texts) * COUNT_SIZE)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._pool, _count_into, texts, results.name)
+            view = results.buf[:len(texts) * COUNT_SIZE].cast("i")
+            counts = view.tolist()
+            view.release()
+            return counts
+        finally:
+            results.close()
+            results.unlink()
+
+    def close(self):
+        """Shuts down the worker processes, if started."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def count_messages(self, messages):
+        """Returns the number of tokens of the messages once formatted with the chat template."""
+        if self.approximate or self.is_fast_backend:
+            return BOS_TOKENS + sum(self.count_text(message["content"]) + self.message_overhead(message["role"]) for message in messages)
+
+        value = self.tokenizer.apply_chat_template(messages, tokenize=False)
+        return len(self.tokenizer.encode(value, add_special_tokens=False))
+
+    def message_overhead(self, role):
+        """Returns the tokens the chat template adds around a message of the given role."""
+        if role not in self._overheads:
+            if self.approximate:
+                overhead = 2
+            elif self.is_fast_backend:
+                overhead = self.count_text(ROLE_MARKERS.get(role, ""))
+            else:
+                anchor = [{"role": "user", "content": "."}]
+                overhead = self.count_messages(anchor + [{"role": role, "content": ""}]) - self.count_messages(anchor)
+            self._overheads[role] = max(overhead, 0)
+        return self._overheads[role]
+
+
+COUNT_SIZE = array("i").itemsize
+_worker_service = None
+
+
+def _init_worker(model_name, cache_dir, tokenizer_path, offline):
+    """Loads the tokenizer once in each worker process."""
+    global _worker_service
+    _worker_service = TokenizerService(model_name, cache_dir, tokenizer_path, offline, approximate=False, workers=0)
+    _worker_service.tokenizer
+
+
+def _count_into(texts, name):
+    """Counts the tokens of the texts in a worker process and writes them to the shared memory block."""
+    results = SharedMemory(name=name)
+    view = results.buf[:len(texts) * COUNT_SIZE].cast("i")
+    view[:] = array("i", _worker_service.count_texts(texts))
+    view.release()
+    results.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_tokenizer_service():
+    """Returns the process-wide tokenizer service."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TokenizerService()
+    return _service
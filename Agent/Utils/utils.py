@@ -1,4 +1,94 @@
+import random
+from collections import deque
+from itertools import islice
+
+
 class Message:
-    def __init__(self, role, content):
+    __slots__ = ("role", "content", "tokens", "wire", "id")
+
+    def __init__(self, role, content, tokens=0, id=None):
         self.role = role
-        self.content = content
\ No newline at end of file
+        self.content = content
+        self.tokens = tokens  # Tokens of the content plus the chat template overhead, counted once
+        self.id = id  # Id given by the conversation store, if the message is stored
+        self.wire = {  # The dict sent to the API, built once
+            "role": role,
+            "content": content,
+            **({"tool_call_id": random.randint(1, 1000)} if role == "tool" else {})
+        }
+
+    def to_dict(self):
+        return {"role": self.role, "content": self.content}
+
+
+class ChatHistory:
+    """Ordered chat messages with running totals and O(1) eviction from the front.
+
+    The API payload of every message is kept alongside, so building a request is a
+    single shallow copy instead of a new dict per message.
+    """
+
+    def __init__(self):
+        self.messages = deque()
+        self.payload = deque()
+        self.user_positions = deque()  # Absolute positions of the user messages
+        self.first_position = 0  # Absolute position of the first message still in the history
+        self.tokens = 0
+        self.chars = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def append(self, message):
+        if message.role == "user":
+            self.user_positions.append(self.first_position + len(self.messages))
+        self.messages.append(message)
+        self.payload.append(message.wire)
+        self.tokens += message.tokens
+        self.chars += len(message.content)
+
+    def slice(self, start, end):
+        """Returns the messages between two indices as a list."""
+        return list(islice(self.messages, start, end))
+
+    def user_indices(self, count):
+        """Returns the indices of the first `count` user messages."""
+        return [position - self.first_position for position in islice(self.user_positions, count)]
+
+    def user_count(self):
+        return len(self.user_positions)
+
+    def remove(self, start, end):
+        """Removes the messages between two indices. Removing from the front is O(1) per message."""
+        if start != 0:
+            kept = self.slice(0, start)
+            self.remove(0, start)
+            self.remove(0, end - start)
+            for message in reversed(kept):
+                self._prepend(message)
+            return
+
+        for _ in range(min(end, len(self.messages))):
+            message = self.messages.popleft()
+            self.payload.popleft()
+            if message.role == "user":
+                self.user_positions.popleft()
+            self.first_position += 1
+            self.tokens -= message.tokens
+            self.chars -= len(message.content)
+
+    def _prepend(self, message):
+        self.first_position -= 1
+        if message.role == "user":
+            self.user_positions.appendleft(self.first_position)
+        self.messages.appendleft(message)
+        self.payload.appendleft(message.wire)
+        self.tokens += message.tokens
+        self.chars += len(message.content)
+
+    def request_payload(self):
+        """Returns the messages as the list of dicts sent to the API."""
+        return list(self.payload)
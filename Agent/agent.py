@@ -1,48 +1,82 @@
 import os
 from dotenv import load_dotenv
 import re
-from openai import OpenAI
-from transformers import AutoTokenizer
-from AgentTools.wiki import Wiki
-from AgentTools.web_searcher import Searcher
-from AgentTools.weather import Weather
-from Utils.utils import Message
-from datetime import datetime
-import random
-import time
+from openai import OpenAI, AsyncOpenAI
+from Utils.utils import Message, ChatHistory
+from Utils.tokenizer import get_tokenizer_service
+from Utils.metrics import metrics, timeit, record_usage, span
+from Utils.run_state import RunState, BUDGET_NAMES
+from Utils.response_cache import get_response_cache
+from Utils.prompt_builder import PromptBuilder
+from Utils.llm_gateway import get_llm_gateway
+from Utils.memory import MemoryArchive, archive_turns
+import asyncio
+import threading
+from contextlib import contextmanager
 
 
 
-def timeit(func):
-    """Decorator to measure and print the execution time of a function."""
-    def timed(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        print(f"Function {func.__name__} took {end_time - start_time:.4f} seconds. ⏱️")
-        return result
-    return timed
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
 
 
+def get_sync_loop():
+    """Returns the event loop that runs the agent for sync callers, started in a daemon thread."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="agent-loop", daemon=True).start()
+    return _sync_loop
+
 
 class Agent:
-    def __init__(self):
+    def __init__(self, client=None, tokenizer=None, tools=None, async_client=None, gateway=None):
+        """Creates an agent. Heavy resources can be shared by passing them in."""
         load_dotenv()
-        self.client = OpenAI(
+        self.client = client or OpenAI(
+            api_key=os.getenv("DEEPSEEK_API_KEY"),
+            base_url=os.getenv("DEEPSEEK_BASE_URL")
+        )
+        self.async_client = async_client or AsyncOpenAI(
             api_key=os.getenv("DEEPSEEK_API_KEY"),
             base_url=os.getenv("DEEPSEEK_BASE_URL")
         )
         self.model_name = "deepseek-ai/DeepSeek-V3"
-        self.tools = {}
-        self.messages = []
+        self.gateway = gateway or get_llm_gateway()  ## Admission control shared by every agent of the process.
+        self.tools = tools if tools is not None else {}
+        self.messages = ChatHistory()
         self.max_iterations = 5
-        self.current_iteration = 0
+        self.max_request_seconds = 60
+        self.max_request_tokens = None  ## Defaults to `max_iterations` calls with a full prompt, see `request_token_budget`.
+        self.max_tool_calls = 8
+        self.max_completion_tokens = 500
+        self.prefetch_tools = True  ## Stream completions and start tools as soon as their Action line is complete.
         self.system_prompt = self.load_prompt("Prompts/system_prompt.txt")
+        self.prompt_builder = PromptBuilder(self.system_prompt)
         self.old_chats_summary = ""
         self.messages_to_summarize = 5
         self.max_messages_tokens = 10000
+        self.summary_soft_tokens = 7000  ## Past this, old chats start being summarized in the background.
+        self.summary_max_tokens = 500  ## Past this, the summary itself is condensed.
+        self.pending_summary = None
         self.summary_prompt = self.load_prompt("Prompts/summary_prompt.txt")
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, cache_dir="./tokenizer_cache")
+        self.compact_summary_prompt = self.load_prompt("Prompts/compact_summary_prompt.txt")
+        self.archive = MemoryArchive(  ## Summarized turns, for recall.
+            model_name=os.getenv("MEMORY_EMBEDDING_MODEL") or None,
+            min_score=float(os.getenv("MEMORY_MIN_SIMILARITY", 0.25))
+        )
+        self.recall_count = 3
+        self.tokenizer = tokenizer or get_tokenizer_service()  ## Loaded lazily and shared by the whole process.
+        self.store = None  ## Conversation store the history is written through to, if any.
+        self.session_id = None
+
+    def spawn(self, tools=None):
+        """Returns a new agent with its own history that shares client, tokenizer, tools (unless given) and gateway."""
+        return Agent(
+            client=self.client, tokenizer=self.tokenizer, tools=tools if tools is not None else self.tools,
+            async_client=self.async_client, gateway=self.gateway
+        )
 
     def register_tool(self, tool):
         """Registers a tool by its name."""
@@ -52,170 +86,508 @@ class Agent:
         """Returns a formatted string listing available tools."""
         return "\n".join([f"{tool.name}: {tool.description}" for tool in self.tools.values()])
 
-    def add_message(self, role, content):
-        """Add a message to the messages list."""
-        self.messages.append(Message(role=role, content=content))
-
-    def get_chat_history(self):
-        """Return the chat history as a list of message dictionaries."""
-        return [
-            {
-                "role": message.role,
-                "content": message.content,
-                **({"tool_call_id": random.randint(1, 1000)} if message.role == "tool" else {})
-            }
-            for message in self.messages
-        ]
+    @property
+    def last_message_id(self):
+        """Store id of the last message of the history, or None."""
+        return self.messages.messages[-1].id if len(self.messages) else None
+
+    @property
+    def history_tokens(self):
+        """Tokens of the whole chat history, kept as a running sum."""
+        return self.messages.tokens
+
+    def add_message(self, role, content, content_tokens=None):
+        """Add a message to the messages list, counting its tokens once unless they are given."""
+        if content_tokens is None:
+            content_tokens = self.num_tokens_from_text(content)
+        tokens = content_tokens + self.tokenizer.message_overhead(role)
+        message = Message(role=role, content=content, tokens=tokens)
+        self.messages.append(message)
+        if self.store is not None:
+            self.store.append(self.session_id, message)
+        return message
+
+    async def aadd_messages(self, pairs):
+        """Adds (role, content) pairs to the messages list, counting their tokens in one batch off the event loop."""
+        counts = await self.tokenizer.acount_texts([content for _, content in pairs])
+        return [self.add_message(role, content, tokens) for (role, content), tokens in zip(pairs, counts)]
+
+    def remove_messages(self, start, end):
+        """Remove a slice of the messages list, keeping the token total in sync."""
+        self.messages.remove(start, end)
+
+    async def ahydrate(self, store, session_id):
+        """Loads the summary and the most recent messages of a stored conversation and writes through to the store from now on.
+
+        Only the messages fitting in `max_messages_tokens` are loaded, with the token counts they were stored with.
+        """
+        summary, messages = await asyncio.to_thread(store.load, session_id, self.max_messages_tokens)
+        self.old_chats_summary = summary
+        self.messages = ChatHistory()
+        for role, content, tokens, message_id in messages:
+            self.messages.append(Message(role=role, content=content, tokens=tokens, id=message_id))
+        self.store = store
+        self.session_id = session_id
+
+    def get_chat_history(self, messages=None):
+        """Return the chat history (or the given messages) as a list of message dictionaries."""
+        if messages is None:
+            return self.messages.request_payload()
+        return [message.wire for message in messages]
 
     def load_prompt(self, path):
         """Returns a prompt from a file."""
         with open(path, "r") as file:
             return file.read() if file else ""
 
-    def summarize_old_chats(self, lines):
+    @timeit
+    async def asummarize_old_chats(self, lines):
         """Summarizes old chat history and returns a concise summary response."""
         prompt = self.summary_prompt.format(lines=lines)
 
-        response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],  ## If you are using gpt you could use system here.
-            max_tokens=120,
-        )
+        async with self.gateway.admit(self.tokenizer.approximate_count(prompt), priority="background", call="summary"):
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],  ## If you are using gpt you could use system here.
+                max_tokens=120,
+            )
+        record_usage(response.usage, call="summary")
 
         return response.choices[0].message.content.strip() if response.choices else "No response from DeepSeek"
 
-    def extract_first_queries(self, chat_history):
-        """Extracts a specified number of consecutive user queries from the given chat history."""
-        user_indices = [i for i, msg in enumerate(chat_history) if msg["role"] == "user"]
+    @timeit
+    async def acompact_summary(self, summary):
+        """Condenses a summary grown past `summary_max_tokens`, or returns it unchanged if DeepSeek doesn't answer."""
+        prompt = self.compact_summary_prompt.format(summary=summary, max_words=int(self.summary_max_tokens * 0.5))
+
+        async with self.gateway.admit(self.tokenizer.approximate_count(prompt), priority="background", call="compaction"):
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.summary_max_tokens,
+            )
+        record_usage(response.usage, call="compaction")
+        metrics.inc("agent_summary_compactions_total")
+
+        compacted = response.choices[0].message.content.strip() if response.choices else ""
+        return compacted or summary
+
+    async def aupdate_memory(self, summary, summarized):
+        """Returns the memory after moving the `summarized` messages out of the history, or None on failure.
+
+        The messages are summarized into `summary`, which is condensed if it grows past its budget,
+        and each of their turns is embedded for the archive. Returns (summary, turns, vectors).
+        """
+        new_summary = await self.asummarize_old_chats(self.get_chat_history(summarized))
+        if new_summary == "No response from DeepSeek":
+            return None
+
+        summary = f"{summary} {new_summary}".strip()
+        if (await self.tokenizer.acount_texts([summary]))[0] > self.summary_max_tokens:
+            summary = await self.acompact_summary(summary)
+
+        turns = archive_turns(summarized)
+        vectors = await asyncio.to_thread(self.archive.embed, turns) if turns else None
+        return summary, turns, vectors
+
+    def extract_first_queries(self):
+        """Returns the slice holding the oldest queries to summarize, or None if summarization isn't due yet."""
+        if self.history_tokens <= self.summary_soft_tokens:
+            return None
+
+        if self.messages.user_count() <= self.messages_to_summarize:
+            return None
+
+        user_indices = self.messages.user_indices(self.messages_to_summarize + 1)
 
         start_index = user_indices[0]
         end_index = user_indices[self.messages_to_summarize]
 
         return start_index, end_index
 
+    def apply_summary(self, memory, start_index, summarized):
+        """Swaps the summarized messages for the new summary and archives their turns, if they are still where they were taken from."""
+        current = self.messages.slice(start_index, start_index + len(summarized))
+        if memory is None or len(current) != len(summarized) or any(a is not b for a, b in zip(current, summarized)):
+            metrics.inc("agent_summaries_discarded_total")
+            return
+
+        summary, turns, vectors = memory
+        print(f"Tokens used by the summary: {self.num_tokens_from_text(summary)}")
+        metrics.inc("agent_summaries_applied_total")
+        self.old_chats_summary = summary
+        if turns:
+            self.archive.add(turns, vectors)
+        self.remove_messages(start_index, start_index + len(summarized))
+        if self.store is not None:
+            self.store.summarize(self.session_id, self.old_chats_summary, [message.id for message in summarized])
+
     @timeit
     def num_tokens_from_messages(self, messages):
         """Return the number of tokens used by a list of messages"""
-        value = self.tokenizer.apply_chat_template(messages, tokenize=False)
-        encoded = self.tokenizer.encode(value)
-        
-        return len(encoded)
+        return self.tokenizer.count_messages(messages)
     
     def num_tokens_from_text(self, text):
         """Return the number of tokens used by the given text."""
-        encoded = self.tokenizer.encode(text)
+        return self.tokenizer.count_text(text)
 
-        return len(encoded)
+    def build_system_prompt(self):
+        """Returns the system prompt filled with the tools and the current date."""
+        return self.prompt_builder.system_prompt(self.get_tools())
 
-    @timeit
-    def think(self):
-        """Think and decide based on the response from DeepSeek."""
-        self.current_iteration += 1
+    ACTION_PATTERN = re.compile(r"Action:\s*(\w+):\s*(.*)")
 
-        if self.current_iteration > self.max_iterations:
-            print("Reached maximum iterations. Stopping.")
-            self.add_message("assistant", "I'm sorry, but I couldn't find a satisfactory answer within the allowed number of iterations.")
-            return
-        
-        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        prompt = self.system_prompt.format(
-            tools=self.get_tools(),
-            date=current_date
-        )
-        response = self.call_DeepSeek(prompt)
-        self.add_message("assistant", response)
-        self.decide(response)
+    def parse_actions(self, response):
+        """Returns every (tool_name, query) requested by the response, empty if there is nothing to run."""
+        if re.search(r"Final Answer:", response):
+            return []
 
-    @timeit
-    def decide(self, response):
-        """Decide on the next action based on the response."""
-        final_answer_match = re.search(r"Final Answer:", response)
-        if final_answer_match:
-            return
+        actions = [
+            (action_match.group(1).strip().lower(), action_match.group(2).strip())
+            for action_match in self.ACTION_PATTERN.finditer(response)
+        ]
+        if not actions:
+            print("No action or final answer found in the response.")
+        return actions
+
+    def prefetch_actions(self, lines, state, prefetched):
+        """Starts the tools of the complete Action lines of a partial response, before it is parsed.
+
+        The tasks are kept in `prefetched` by (tool_name, query); the ones the final parse doesn't
+        ask for are cancelled by the caller.
+        """
+        for action_match in self.ACTION_PATTERN.finditer(lines):
+            tool_name, query = action_match.group(1).strip().lower(), action_match.group(2).strip()
+            if tool_name not in self.tools or (tool_name, query) in prefetched:
+                continue
+            if state is not None and len(prefetched) >= state.remaining_tool_calls:
+                break
+            time_left = state.remaining_seconds if state is not None else None
+            prefetched[(tool_name, query)] = asyncio.create_task(self.arun_tool(self.tools[tool_name], query, time_left))
+            metrics.inc("agent_tool_prefetches_total", tool=tool_name)
 
-        action_match = re.search(r"Action:\s*(\w+):\s*(.*)", response)
-        if action_match:
-            tool_name = action_match.group(1).strip().lower()
-            query = action_match.group(2).strip()
-            self.act(tool_name, query)
+    @contextmanager
+    def prefetch_scope(self):
+        """Yields the dict collecting the tools prefetched in an iteration, or None if prefetching is off.
 
-        if not final_answer_match and not action_match:
-            print("No action or final answer found in the response.")
+        Prefetched tools the iteration didn't use are cancelled on exit.
+        """
+        prefetched = {}
+        try:
+            yield prefetched if self.prefetch_tools else None
+        finally:
+            for (tool_name, _), task in prefetched.items():
+                task.cancel()
+                metrics.inc("agent_tool_prefetches_wasted_total", tool=tool_name)
+
+    async def arun_tool(self, tool, query, time_left=None):
+        """Runs a tool bounded by its timeout and the time left, returning its result or a timeout message."""
+        timeout = tool.timeout if time_left is None else min(tool.timeout, time_left)
+        try:
+            return await asyncio.wait_for(tool.arun(query), timeout=timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("agent_tool_timeouts_total", tool=tool.name)
+            return f"No response after {timeout:.0f} seconds."
 
     @timeit
-    def act(self, tool_name, query):
-        """Act on the response by calling the appropriate tool."""
-        tool = self.tools.get(tool_name)
-
-        if tool:
-            result = tool.use(query)
-            observation = f"Observation from {tool_name}: {result}"
-            self.add_message("tool", observation)                   ## If you are using gpt you could simply use system here.
-            self.think()
-        else:
-            print(f"No tool registered for choice: {tool_name}")
-            self.add_message("system", f"Error: Tool {tool_name} not found")
-    
+    async def arun_actions(self, actions, time_left=None, prefetched=None):
+        """Runs the tools of all the actions concurrently, each bounded by its timeout.
+
+        Actions already started while the response was streamed are awaited instead of run again.
+        Returns the observations (or errors) to add to the history as (role, content) pairs.
+        """
+        prefetched = prefetched if prefetched is not None else {}
+        known = [(tool_name, query) for tool_name, query in actions if tool_name in self.tools]
+        results = await asyncio.gather(*(
+            prefetched.pop((tool_name, query), None) or self.arun_tool(self.tools[tool_name], query, time_left)
+            for tool_name, query in known
+        ))
+        results = dict(zip(known, results))
+
+        added = []
+        for tool_name, query in actions:
+            if (tool_name, query) in results:
+                added.append(("tool", f"Observation from {tool_name}: {results[(tool_name, query)]}"))
+            else:
+                print(f"No tool registered for choice: {tool_name}")
+                added.append(("system", f"Error: Tool {tool_name} not found"))
+
+        return added
+
     @timeit
-    def memory_management(self, chat_history):
-        """Manages memory by summarizing and deleting old chat history"""
+    async def amemory_management(self):
+        """Manages memory by summarizing old chat history off the critical path.
+
+        Past the soft threshold the oldest queries are summarized in a background task and
+        swapped in on a later call once ready. Past `max_messages_tokens` the call waits for it.
+        """
         try:
-            user_messages = [msg for msg in chat_history if msg["role"] == "user"]
-            if len(user_messages) > self.messages_to_summarize and self.num_tokens_from_messages(chat_history) > self.max_messages_tokens:
-                indices = self.extract_first_queries(chat_history)
-                if indices:
-                    start_index, end_index = indices
-                    lines = chat_history[start_index:end_index]
-                    print(f"Tokens used by the conversation to summarize: {self.num_tokens_from_messages(lines)}")
-                    new_summary = self.summarize_old_chats(lines)
-                    if new_summary != "No response from DeepSeek":
-                        print(f"Tokens used by the new summary: {self.num_tokens_from_text(new_summary)}")
-                        self.old_chats_summary = f"{self.old_chats_summary} {new_summary}".strip()
-                        del self.messages[start_index:end_index]
+            if self.pending_summary and self.pending_summary[0].done():
+                task, start_index, summarized = self.pending_summary
+                self.pending_summary = None
+                self.apply_summary(task.result(), start_index, summarized)
+
+            indices = self.extract_first_queries()
+            if indices and not self.pending_summary:
+                start_index, end_index = indices
+                summarized = self.messages.slice(start_index, end_index)
+                print(f"Tokens used by the conversation to summarize: {sum(message.tokens for message in summarized)}")
+                task = asyncio.create_task(self.aupdate_memory(self.old_chats_summary, summarized))
+                self.pending_summary = (task, start_index, summarized)
+                metrics.inc("agent_summaries_started_total")
+
+            if self.pending_summary and self.history_tokens > self.max_messages_tokens:
+                metrics.inc("agent_summary_waits_total")
+                task, start_index, summarized = self.pending_summary
+                self.pending_summary = None
+                self.apply_summary(await task, start_index, summarized)
         except Exception as e:
+            self.pending_summary = None
             print(f"An error occurred during memory management: {e}")
  
+    async def aprepare_messages(self, prompt, state=None):
+        """Runs memory management and returns the messages to send to DeepSeek."""
+        await self.amemory_management()
+
+        recalled = state.recalled if state is not None else ()
+        return self.prompt_builder.build(prompt, self.old_chats_summary, self.messages.payload, recalled)
+
     @timeit
-    def call_DeepSeek(self, prompt):
-        """Call the DeepSeek API to get a response."""
-        chat_history = self.get_chat_history()
-        
-        self.memory_management(chat_history)
+    async def acall_DeepSeek(self, prompt, state=None, emit=None, prefetched=None):
+        """Call the DeepSeek API to get a response.
+
+        When `emit` is given the completion is streamed and every text delta is emitted as a
+        `token` event. When `prefetched` is given it is streamed too, and the tools of every
+        Action line are started as soon as the line is complete (see `prefetch_actions`).
+        The tokens used are added to the run state.
+        """
+        messages = await self.aprepare_messages(prompt, state)
+        estimated_tokens = self.history_tokens + self.tokenizer.approximate_count(prompt + self.old_chats_summary)
+
+        async with self.gateway.admit(estimated_tokens, priority="interactive", call="chat"):
+            if emit is None and prefetched is None:
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    max_tokens=self.max_completion_tokens,
+                    temperature=0.5,
+                )
+                usage = response.usage
+                content = response.choices[0].message.content if response.choices else ""
+            else:
+                stream = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    max_tokens=self.max_completion_tokens,
+                    temperature=0.5,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                usage, chunks, scanned = None, [], 0
+                async for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        delta = chunk.choices[0].delta.content
+                        chunks.append(delta)
+                        if emit is not None:
+                            emit({"type": "token", "content": delta})
+                        if prefetched is not None and "\n" in delta:
+                            text = "".join(chunks)
+                            if "Final Answer:" not in text:
+                                lines_end = text.rindex("\n")
+                                self.prefetch_actions(text[scanned:lines_end], state, prefetched)
+                                scanned = lines_end + 1
+                content = "".join(chunks)
+
+        record_usage(usage, call="chat")
+        if state is not None and usage is not None:
+            state.tokens_used += usage.total_tokens or 0
+
+        return content.strip() or "No response from DeepSeek"
 
-        if self.old_chats_summary:
-            prompt += f"\n\nOld messages summary:\n{self.old_chats_summary}"
-        
-        messages = [{"role": "system", "content": prompt}] + chat_history
+    @timeit
+    async def arun(self, state, emit=None):
+        """Runs the ReAct loop for the query of `state`, one step at a time.
+
+        Each step calls DeepSeek once and runs the requested tools. The loop stops on a final
+        answer, when a budget of the state runs out or when the client is gone. Every message it
+        adds is kept in `state.steps` and emitted as a `message` event.
+        """
+        emit = emit or (lambda event: None)
+
+        async def add_steps(*pairs):
+            for message in await self.aadd_messages(pairs):
+                state.steps.append(message)
+                emit({"type": "message", "role": message.role, "content": message.content})
+
+        state.used_context = bool(len(self.messages) or self.old_chats_summary)
+        await self.aadd_messages([("user", state.query)])
+        if len(self.archive):
+            state.recalled = await asyncio.to_thread(self.archive.search, state.query, self.recall_count)
+            state.used_context = state.used_context or bool(state.recalled)
+
+        while True:
+            if state.is_cancelled and await state.is_cancelled():
+                print("Client disconnected. Stopping.")
+                state.stop_reason = "cancelled"
+                break
+
+            budget = state.exhausted_budget()
+            if budget:
+                print(f"Reached the {BUDGET_NAMES[budget]} budget. Stopping.")
+                state.stop_reason = budget
+                await add_steps(("assistant", f"I'm sorry, but I couldn't find a satisfactory answer within the allowed {BUDGET_NAMES[budget]}."))
+                break
 
-        response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            max_tokens=500,
-            temperature=0.5,
+            state.iteration += 1
+            with span("iteration", number=state.iteration), self.prefetch_scope() as prefetched:
+                try:
+                    response = await asyncio.wait_for(
+                        self.acall_DeepSeek(self.build_system_prompt(), state, emit if state.stream else None, prefetched),
+                        timeout=state.remaining_seconds
+                    )
+                except asyncio.TimeoutError:
+                    continue  ## The time budget is reported on the next check.
+                await add_steps(("assistant", response))
+
+                actions = self.parse_actions(response)
+                if not actions:
+                    break
+                if not state.remaining_tool_calls:
+                    state.stop_reason = "tool_calls"
+                    await add_steps(("assistant", f"I'm sorry, but I couldn't find a satisfactory answer within the allowed {BUDGET_NAMES['tool_calls']}."))
+                    break
+
+                actions = actions[:state.remaining_tool_calls]
+                state.tool_calls += len(actions)
+                state.tools_used.update(tool_name for tool_name, _ in actions if tool_name in self.tools)
+                added = await self.arun_actions(actions, state.remaining_seconds, prefetched)
+                await add_steps(*added)
+                if not any(role == "tool" for role, _ in added):
+                    break
+
+        return state.steps
+
+    def request_token_budget(self):
+        """Returns the tokens a run may use, prompts included.
+
+        Every call resends the whole prompt, so by default the budget allows `max_iterations`
+        calls with a full history, summary and system prompt plus their completions.
+        """
+        if self.max_request_tokens:
+            return self.max_request_tokens
+        prompt_tokens = self.max_messages_tokens + self.summary_max_tokens + self.tokenizer.approximate_count(self.build_system_prompt())
+        return self.max_iterations * (prompt_tokens + self.max_completion_tokens)
+
+    def new_run(self, query, is_cancelled=None, stream=False):
+        """Returns the state of a new run with the budgets of this agent."""
+        return RunState(
+            query,
+            max_iterations=self.max_iterations,
+            max_seconds=self.max_request_seconds,
+            max_tokens=self.request_token_budget(),
+            max_tool_calls=self.max_tool_calls,
+            is_cancelled=is_cancelled,
+            stream=stream
         )
 
-        return response.choices[0].message.content.strip() if response.choices else "No response from DeepSeek"
+    async def aexecute(self, query, is_cancelled=None, use_cache=False):
+        """Execute a user query and return the messages the Agent added while answering it.
+
+        With `use_cache`, a cached final answer for the same (or a similar) query is returned
+        without calling DeepSeek, and new final answers are cached.
+        """
+        if use_cache:
+            cached = await self.acached_answer(query)
+            if cached:
+                return cached
+
+        state = self.new_run(query, is_cancelled)
+        steps = await self.arun(state)
+        if use_cache:
+            await self.acache_answer(state)
+        return steps
+
+    async def acached_answer(self, query):
+        """Adds the query and its cached answer to the history and returns the answer message, if cached.
+
+        A session with a history or a summary is only given answers cached for it, as shared
+        answers came from runs without a conversation. A new session is only given shared answers.
+        """
+        if len(self.messages) or self.old_chats_summary:
+            if not self.session_id:
+                return []
+            scopes = (self.session_id,)
+        else:
+            scopes = (None,)
+        answer = await asyncio.to_thread(get_response_cache().lookup, query, scopes)
+        if answer is None:
+            return []
 
-    def execute(self, query):
-        """Execute a user query and return the full Agent response."""
-        self.current_iteration = 0
         self.add_message("user", query)
-        self.think()
-        
-        result_messages = []
-        for message in self.messages[::-1]:
-            if message.role == "user":
-                break
-            elif message.role != "user":
-                result_messages.append(message)
+        return [self.add_message("assistant", answer)]
+
+    async def acache_answer(self, state):
+        """Caches the final answer of a completed run, for as long as its freshest tool data is valid.
+
+        An answer that the conversation may have shaped (earlier messages, the summary or
+        recalled turns) is only cached for this session, and not at all without a session id.
+        """
+        if state.stop_reason or not state.steps or "Final Answer:" not in state.steps[-1].content:
+            return
+        if state.used_context and not self.session_id:
+            return
+
+        ttls = [self.tools[name].cache_ttl for name in state.tools_used if self.tools[name].cache_ttl]
+        freshness = "+".join(sorted(state.tools_used)) or "static"
+        scope = self.session_id if state.used_context else None
+        await asyncio.to_thread(
+            get_response_cache().store, state.query, state.steps[-1].content, min(ttls) if ttls else None, freshness, scope
+        )
+
+    def execute(self, query):
+        """Sync version of `aexecute` for callers without an event loop, like the CLI."""
+        return asyncio.run_coroutine_threadsafe(self.aexecute(query), get_sync_loop()).result()
+
+    async def astream_execute(self, query, is_cancelled=None, use_cache=False):
+        """Execute a user query, yielding events as the ReAct loop progresses.
+
+        Events are dicts: `token` for every text delta of the model, `message` for every
+        message added to the history and a final `done`. The run is cancelled if the consumer
+        stops iterating.
+        """
+        cached = await self.acached_answer(query) if use_cache else []
+        for message in cached:
+            yield {"type": "message", "role": message.role, "content": message.content}
+        if cached:
+            yield {"type": "done"}
+            return
+
+        state = self.new_run(query, is_cancelled, stream=True)
+        events = asyncio.Queue()
+        run = asyncio.create_task(self.arun(state, events.put_nowait))
+        run.add_done_callback(lambda _: events.put_nowait(None))
+
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            run.result()  ## Raises the error of the run, if any.
+        finally:
+            run.cancel()
 
-        return result_messages[::-1]
+        if use_cache:
+            await self.acache_answer(state)
+        yield {"type": "done"}
 
 
 
 ## Tested as a standalone script
 if __name__ == "__main__":
     from colorama import Fore, Style, init
+    from AgentTools.wiki import Wiki
+    from AgentTools.web_searcher import Searcher
+    from AgentTools.weather import Weather
     init(autoreset=True)
     agent = Agent()
 
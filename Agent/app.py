@@ -1,9 +1,20 @@
-from fastapi import FastAPI, HTTPException
+import os
+import re
+import json
+import tempfile
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from agent import Agent
+from session_pool import SessionPool
+from batch import Checkpoint, read_items, run_batch
 from AgentTools.wiki import Wiki
 from AgentTools.web_searcher import Searcher
 from AgentTools.weather import Weather
+from AgentTools.cache import get_tool_cache
+from Utils.metrics import metrics, trace
+from Utils.llm_gateway import GatewayOverloaded
 
 app = FastAPI()
 agent = Agent()
@@ -15,19 +26,106 @@ def register_default_tools():
 
 
 register_default_tools()
+sessions = SessionPool(agent)
 
 
 class QueryRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None
+    trace: bool = False  # Include the timing spans of the request in the response
+    use_cache: bool = False  # Answer repeated questions from the response cache
 
 
 @app.post("/chat")
-async def chat(request: QueryRequest):
+async def chat(request: QueryRequest, http_request: Request):
     try:
-        result_messages = agent.execute(request.query)
+        with trace() as request_trace:
+            async with sessions.session(request.session_id) as session:
+                result_messages = await session.agent.aexecute(
+                    request.query, is_cancelled=http_request.is_disconnected, use_cache=request.use_cache
+                )
 
-        return {"response": result_messages}
+        response = {"response": [message.to_dict() for message in result_messages], "session_id": session.session_id}
+        if request.trace:
+            response["trace"] = request_trace.to_dict()
+        return response
+    except GatewayOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(int(e.retry_after), 1))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: QueryRequest, http_request: Request):
+    """Streams the ReAct loop as newline-delimited JSON events."""
+    async def events():
+        async with sessions.session(request.session_id) as session:
+            yield json.dumps({"type": "session", "session_id": session.session_id}) + "\n"
+            try:
+                async for event in session.agent.astream_execute(
+                    request.query, is_cancelled=http_request.is_disconnected, use_cache=request.use_cache
+                ):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            except GatewayOverloaded as e:
+                yield json.dumps({"type": "error", "status": 429, "detail": str(e), "retry_after": e.retry_after}) + "\n"
+            except Exception as e:
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/chat/batch")
+async def chat_batch(http_request: Request, concurrency: int = 16, checkpoint: Optional[str] = None):
+    """Answers every query of a JSONL body, each in its own agent, streaming JSONL results in completion order.
+
+    With a `checkpoint` name, results are also kept on the server and the queries already
+    answered under that name are skipped, so an interrupted batch can be sent again to resume it.
+    """
+    if checkpoint is not None and not re.fullmatch(r"[\w-]+", checkpoint):
+        raise HTTPException(status_code=400, detail="The checkpoint name may only contain letters, digits, '_' and '-'.")
+    concurrency = max(1, min(concurrency, int(os.getenv("BATCH_MAX_CONCURRENCY", 64))))
+
+    ## The body is read before the response starts: once it streams, Starlette may consume the
+    ## request messages itself to watch for a disconnect, and body chunks would be lost.
+    body = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for chunk in http_request.stream():
+        body.write(chunk)
+    body.seek(0)
+
+    async def body_chunks():
+        while chunk := body.read(64 * 1024):
+            yield chunk
+
+    saved = None
+    if checkpoint:
+        checkpoint_dir = os.getenv("BATCH_CHECKPOINT_DIR", "batch_checkpoints")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        saved = Checkpoint(os.path.join(checkpoint_dir, f"{checkpoint}.jsonl"))
+
+    async def results():
+        try:
+            async for result in run_batch(agent, read_items(body_chunks()), concurrency, saved.done if saved else ()):
+                if saved:
+                    saved.record(result)
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"status": "error", "detail": str(e)}) + "\n"
+        finally:
+            body.close()
+            if saved:
+                saved.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.get("/tools/cache")
+async def tool_cache_stats():
+    """Returns the hit and miss counters of the tool cache."""
+    return get_tool_cache().stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Exposes the agent metrics in the Prometheus text format."""
+    metrics.set("agent_sessions", len(sessions))
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
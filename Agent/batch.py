@@ -0,0 +1,218 @@
+"""Runs the agent over a JSONL file of queries, for evaluations and reports.
+
+Each line is {"query": ..., "id": ...}; the id defaults to the line number. Run from the Agent folder:
+    python batch.py queries.jsonl --out results.jsonl --concurrency 32
+
+Results are appended to the output file as JSONL in completion order. Running the same command
+again skips the ids already answered, so an interrupted batch resumes where it stopped.
+"""
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import sys
+import time
+from AgentTools.base_tool import BaseTool
+from AgentTools.cache import normalize_query
+from Utils.llm_gateway import GatewayOverloaded
+from Utils.metrics import metrics
+
+
+class SharedTool(BaseTool):
+    """Wraps a tool so that a batch runs each distinct query once.
+
+    Concurrent and later calls with the same normalized query wait for the same result.
+    Results the tool wouldn't cache, like errors, are not shared with later calls.
+    """
+
+    def __init__(self, tool):
+        super().__init__(tool.name, tool.description, cache_ttl=tool.cache_ttl, timeout=tool.timeout, max_tokens=tool.max_tokens)
+        self.tool = tool
+        self.calls = {}
+
+    def use(self, query):
+        return self.tool.run(query)
+
+    def is_cacheable(self, result):
+        return self.tool.is_cacheable(result)
+
+    async def arun(self, query):
+        key = normalize_query(query)
+        call = self.calls.get(key)
+        if call is None:
+            call = self.calls[key] = asyncio.ensure_future(self.tool.arun(query))
+        else:
+            metrics.inc("agent_batch_shared_tool_calls_total", tool=self.name)
+
+        result = await asyncio.shield(call)  ## A caller timing out doesn't cancel the call for the others.
+        if not self.is_cacheable(result) and self.calls.get(key) is call:
+            del self.calls[key]
+        return result
+
+
+class Checkpoint:
+    """JSONL file of batch results. The ids answered successfully are skipped when a batch is resumed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  ## A line cut short by the interruption.
+                    if result.get("status") == "ok":
+                        self.done.add(result["id"])
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, result):
+        self.file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+async def read_items(chunks):
+    """Yields the query items of a JSONL stream given as chunks of bytes or text, numbering them by line."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, line_number = "", 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield parse_item(line, line_number)
+    if buffer.strip():
+        yield parse_item(buffer, line_number + 1)
+
+
+def parse_item(line, line_number):
+    try:
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item.get("query"), str) or not item["query"].strip():
+            raise ValueError("missing query")
+    except (ValueError, AttributeError) as e:
+        return {"id": line_number, "error": f"Invalid line {line_number}: {e}"}
+    item.setdefault("id", line_number)
+    return item
+
+
+async def run_item(base_agent, tools, item, max_retries=5):
+    """Answers one query with a fresh agent and returns its result, retrying while the gateway is overloaded."""
+    start_time = time.perf_counter()
+    result = {"id": item["id"], "query": item.get("query")}
+    if "error" in item:
+        return {**result, "status": "error", "error": item["error"], "seconds": 0.0}
+
+    for attempt in range(max_retries + 1):
+        agent = base_agent.spawn(tools=tools)
+        state = agent.new_run(item["query"])
+        try:
+            steps = await agent.arun(state)
+            result.update(
+                status="ok",
+                answer=steps[-1].content if steps else "",
+                stop_reason=state.stop_reason,
+                iterations=state.iteration,
+                tool_calls=state.tool_calls,
+                tokens=state.tokens_used,
+            )
+            break
+        except GatewayOverloaded as e:
+            if attempt == max_retries:
+                result.update(status="overloaded", error=str(e))
+                break
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            result.update(status="error", error=str(e))
+            break
+
+    result["seconds"] = round(time.perf_counter() - start_time, 3)
+    metrics.inc("agent_batch_items_total", status=result["status"])
+    return result
+
+
+async def run_batch(base_agent, items, concurrency=16, done=()):
+    """Runs the queries of `items` (an async iterable of dicts), yielding results in completion order.
+
+    Every query gets its own agent, at most `concurrency` at a time, and tool calls are shared
+    across the whole batch. Items whose id is in `done` are skipped.
+    """
+    tools = {name: SharedTool(tool) for name, tool in base_agent.tools.items()}
+    source = aiter(items)
+    source_lock = asyncio.Lock()
+    results = asyncio.Queue()
+
+    async def worker():
+        while True:
+            async with source_lock:
+                item = await anext(source, None)
+            if item is None:
+                return
+            if item["id"] not in done:
+                results.put_nowait(await run_item(base_agent, tools, item))
+
+    def finished(future):
+        if not future.cancelled():
+            future.exception()  ## Marks the error as retrieved, it is raised below unless the consumer stopped.
+        results.put_nowait(None)
+
+    workers = asyncio.gather(*(worker() for _ in range(concurrency)))
+    workers.add_done_callback(finished)
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await workers  ## Raises the error of a worker, e.g. reading the input, if any.
+    finally:
+        workers.cancel()
+
+
+async def file_chunks(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            yield line
+
+
+async def main():
+    from agent import Agent
+    from AgentTools.wiki import Wiki
+    from AgentTools.web_searcher import Searcher
+    from AgentTools.weather import Weather
+
+    parser = argparse.ArgumentParser(description="Runs the agent over a JSONL file of queries.")
+    parser.add_argument("queries", help="JSONL file with one {\"query\": ..., \"id\": ...} per line.")
+    parser.add_argument("--out", default="results.jsonl", help="JSONL file the results are appended to, also used to resume.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Queries answered at the same time.")
+    args = parser.parse_args()
+
+    agent = Agent()
+    for tool in [Wiki(), Searcher(), Weather()]:
+        agent.register_tool(tool)
+
+    checkpoint = Checkpoint(args.out)
+    if checkpoint.done:
+        print(f"Resuming: skipping {len(checkpoint.done)} queries already answered.", file=sys.stderr)
+
+    start_time = time.perf_counter()
+    counts = {}
+    try:
+        async for result in run_batch(agent, read_items(file_chunks(args.queries)), args.concurrency, checkpoint.done):
+            checkpoint.record(result)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            answered = sum(counts.values())
+            if answered % 100 == 0:
+                print(f"{answered} queries, {answered / (time.perf_counter() - start_time):.2f} queries/s", file=sys.stderr)
+    finally:
+        checkpoint.close()
+    print(f"Done in {time.perf_counter() - start_time:.1f} seconds: {counts}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import os
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from Utils.conversation_store import get_conversation_store
+
+
+class Session:
+    """Conversation state of a single user, backed by its own Agent."""
+
+    def __init__(self, session_id, agent):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.active = 0
+        self.memory_bytes = 0
+        self.hydrated = False
+
+    def estimate_memory(self):
+        """Returns a rough estimate of the bytes held by the session history."""
+        return len(self.agent.old_chats_summary) + self.agent.messages.chars + self.agent.archive.nbytes
+
+
+class SessionPool:
+    """Keeps one agent per session, evicting by LRU, TTL and a memory cap.
+
+    The tokenizer, the OpenAI client and the tools come from a single base agent
+    and are shared by every session; only the history and summary are per session.
+    With a conversation store, a session evicted here is hydrated from the store the
+    next time it is used, and so is a session another worker added messages to since.
+    """
+
+    def __init__(self, base_agent, max_sessions=None, session_ttl=None, max_memory_mb=None, store=None):
+        load_dotenv()
+        self.base_agent = base_agent
+        self.max_sessions = max_sessions or int(os.getenv("MAX_SESSIONS", 500))
+        self.session_ttl = session_ttl or float(os.getenv("SESSION_TTL_SECONDS", 3600))
+        self.max_memory_bytes = (max_memory_mb or float(os.getenv("SESSION_MEMORY_MB", 256))) * 1024 * 1024
+        self.store = store or get_conversation_store()
+        self.sessions = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _acquire(self, session_id):
+        """Returns the session for the id, creating it if needed, and marks it as active."""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None or self._expired(session):
+                if session is not None:
+                    self._remove(session_id)
+                agent = self.base_agent.spawn()
+                agent.session_id = session_id
+                session = Session(session_id, agent)
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            session.active += 1
+            session.last_used = time.monotonic()
+            return session
+
+    def _release(self, session):
+        """Updates the memory usage of a session and evicts sessions over the limits."""
+        with self.lock:
+            session.active -= 1
+            session.last_used = time.monotonic()
+            if self.sessions.get(session.session_id) is session:
+                new_size = session.estimate_memory()
+                self.memory_bytes += new_size - session.memory_bytes
+                session.memory_bytes = new_size
+            self._evict()
+
+    def _expired(self, session):
+        return time.monotonic() - session.last_used > self.session_ttl
+
+    def _remove(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.memory_bytes -= session.memory_bytes
+
+    def _evict(self):
+        """Drops expired sessions, then least recently used ones until within limits."""
+        for session_id, session in list(self.sessions.items()):
+            if not self._expired(session):
+                break  ## Sessions are kept in LRU order, so the rest are newer.
+            if not session.active:
+                self._remove(session_id)
+
+        for session_id, session in list(self.sessions.items()):
+            if len(self.sessions) <= self.max_sessions and self.memory_bytes <= self.max_memory_bytes:
+                break
+            if not session.active:
+                self._remove(session_id)
+
+    @asynccontextmanager
+    async def session(self, session_id=None):
+        """Yields the session for the given id, holding its lock while in use.
+
+        Turns of the same session run one at a time; different sessions run concurrently.
+        """
+        session = self._acquire(session_id or uuid.uuid4().hex)
+        try:
+            async with session.lock:
+                if self.store is not None:
+                    last_message_id = await asyncio.to_thread(self.store.last_message_id, session.session_id)
+                    if not session.hydrated or last_message_id != session.agent.last_message_id:
+                        await session.agent.ahydrate(self.store, session.session_id)
+                        session.hydrated = True
+                yield session
+        finally:
+            self._release(session)
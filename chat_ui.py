@@ -1,8 +1,10 @@
 import streamlit as st
 import requests
+import json
+import uuid
 
 # FastAPI URL
-FASTAPI_URL = "http://127.0.0.1:8000/chat"
+FASTAPI_STREAM_URL = "http://127.0.0.1:8000/chat/stream"
 
 # Streamlit UI
 st.title("ReAct Agent Chat")
@@ -14,11 +16,21 @@ with st.sidebar:
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+# Each browser session keeps its own conversation on the backend
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Function to display chat messages in the main chat
 def display_message(role, content):
     with st.chat_message(role):
         st.markdown(content)
 
+# Function to highlight the Chain of Thought markers
+def format_thoughts(content):
+    return content.replace("Thought:", "\n:red[**Thought**]:") \
+                  .replace("Action:", "\n:blue[**Action**]:") \
+                  .replace("PAUSE", "\n:violet[**PAUSE**]")
+
 # Function to classify messages into sidebar or main chat
 def process_messages(messages):
     sidebar_messages = []
@@ -38,10 +50,7 @@ def process_messages(messages):
         if "Observation" in content:
             sidebar_messages.append(":orange[**Observation**] from :green[**Tool**] provided")
         elif "Thought:" in content or "Action:" in content or "PAUSE" in content:
-            formatted_content = content.replace("Thought:", "\n:red[**Thought**]:") \
-                                       .replace("Action:", "\n:blue[**Action**]:") \
-                                       .replace("PAUSE", "\n:violet[**PAUSE**]")
-            sidebar_messages.append(formatted_content)
+            sidebar_messages.append(format_thoughts(content))
         elif content:
             main_messages.append({"role": role, "content": content})
 
@@ -55,40 +64,72 @@ def process_messages(messages):
 for message in st.session_state.chat_history:
     display_message(message["role"], message["content"])
 
+# Function to check whether a partial response is Chain of Thought rather than an answer
+def is_reasoning(text):
+    head = text.lstrip()[:8]
+    return any(marker.startswith(head) or head.startswith(marker) for marker in ("Thought:", "Action:"))
+
+# Function to render a response that is still being streamed
+def render_live(text, thoughts_placeholder, answer_placeholder):
+    if "Final Answer:" in text:
+        thoughts, answer = text.split("Final Answer:", 1)
+        thoughts_placeholder.markdown(format_thoughts(thoughts))
+        answer_placeholder.markdown(answer.strip())
+    elif is_reasoning(text):
+        thoughts_placeholder.markdown(format_thoughts(text))
+    else:
+        answer_placeholder.markdown(text)
+
 # Main chat input
 if user_input := st.chat_input("How can I help?"):
     st.session_state.chat_history.append({"role": "user", "content": user_input})
     display_message("user", user_input)
 
-    # Get response from FastAPI backend
+    # Stream the response from FastAPI backend
     try:
-        response = requests.post(FASTAPI_URL, json={"query": user_input})
-
-        if response.status_code == 200:
-            data = response.json()
-            ai_response = data["response"]
-
-            # Process messages into sidebar and main chat
-            sidebar_messages, main_messages = process_messages(ai_response)
-
-            # Display sidebar messages
-            with st.sidebar:
-                for sidebar_msg in sidebar_messages:
-                    st.markdown(sidebar_msg)
-
-            # Display main chat messages
-            for msg in main_messages:
-                st.session_state.chat_history.append(msg)
-                display_message(msg["role"], msg["content"])
-
-        else:
-            st.error(f"Error: {response.status_code}, {response.json().get('detail', 'Unknown error')}")
+        payload = {"query": user_input, "session_id": st.session_state.session_id}
+        with requests.post(FASTAPI_STREAM_URL, json=payload, stream=True) as response:
+            if response.status_code == 200:
+                with st.chat_message("assistant"):
+                    answer_placeholder = st.empty()
+                thoughts_placeholder = None
+                live_text = ""
+                answer = None
+
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+
+                    if event["type"] == "token":
+                        if thoughts_placeholder is None:
+                            thoughts_placeholder = st.sidebar.empty()
+                        live_text += event["content"]
+                        render_live(live_text, thoughts_placeholder, answer_placeholder)
+
+                    elif event["type"] == "message":
+                        # Replace the live text with the formatted message
+                        if thoughts_placeholder is not None:
+                            thoughts_placeholder.empty()
+                        thoughts_placeholder = None
+                        live_text = ""
+
+                        sidebar_messages, main_messages = process_messages([event])
+                        with st.sidebar:
+                            for sidebar_msg in sidebar_messages:
+                                st.markdown(sidebar_msg)
+                        if main_messages:
+                            answer = main_messages[-1]["content"]
+                            answer_placeholder.markdown(answer)
+
+                    elif event["type"] == "error":
+                        st.error(f"An error occurred: {event['detail']}")
+
+                if answer:
+                    st.session_state.chat_history.append({"role": "assistant", "content": answer})
+
+            else:
+                st.error(f"Error: {response.status_code}, {response.json().get('detail', 'Unknown error')}")
 
     except Exception as e:
         st.error(f"An error occurred: {e}")
-
-
-
-
-
-